@@ -0,0 +1,121 @@
+"""Telemetría ASCII contra binaria: decodificación en memoria y loopback por pty.
+
+    python benchmarks/bench_binproto.py [n_muestras]
+
+El loopback abre un pseudo-terminal, conecta al esclavo una DeviceSession
+atendida por un IOLoop y desde el maestro responde como el firmware:
+texto hasta recibir "b=1" y tramas del codificador de referencia después
+(con algunas corrompidas).
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from binproto import FRAME_SIZE, FrameDecoder, encodeFrames
+from session import DeviceSession, IOLoop
+from telemetry import LineParser
+
+UART_BITS_PER_BYTE = 10
+BAUD = 9600
+
+
+def makeSamples(n):
+    t_ms = np.arange(n, dtype=np.uint32) * 2
+    ang = ((np.arange(n) * 0.37) % 720.0 - 360.0).astype(np.float32)
+    return ang, t_ms
+
+
+def asciiStream(ang, t_ms):
+    return ''.join(f"{a:.2f},0,{t}\n" for a, t in zip(ang.tolist(), t_ms.tolist())).encode('utf-8')
+
+
+def decodeRate(decoder, data, n, chunk=4096):
+    t0 = time.perf_counter()
+    got = 0
+    for i in range(0, len(data), chunk):
+        t, _ = decoder.feed(data[i:i + chunk])
+        got += t.shape[0]
+    dt = time.perf_counter() - t0
+    assert got == n, (type(decoder).__name__, got, n)
+    return n / dt
+
+
+def fakeFirmware(master, ang, t_ms, corrupt_every, done):
+    cmd = b''
+    while b'b=1\n' not in cmd:
+        cmd += os.read(master, 64)
+
+    data = bytearray(encodeFrames(ang, t_ms))
+    for k in range(corrupt_every, len(ang), corrupt_every):
+        data[k * FRAME_SIZE + 4] ^= 0xFF
+    view = memoryview(data)
+    for i in range(0, len(view), 4096):
+        os.write(master, view[i:i + 4096])
+    done.set()
+
+
+def loopback(n, corrupt_every=1000):
+    master, slave = os.openpty()
+    ang, t_ms = makeSamples(n)
+    session = DeviceSession(os.ttyname(slave), BAUD)
+    session.open()
+    loop = IOLoop()
+    loop.add(session)
+    loop.start()
+    session.setBinary(True)
+
+    done = threading.Event()
+    writer = threading.Thread(target=fakeFirmware, args=(master, ang, t_ms, corrupt_every, done), daemon=True)
+    t0 = time.perf_counter()
+    writer.start()
+
+    expected = n - len(range(corrupt_every, n, corrupt_every))
+    got_t = []
+    got = 0
+    deadline = time.time() + 60
+    while got < expected and time.time() < deadline:
+        for t, _, _ in session.drain():
+            got_t.append(t)
+            got += t.shape[0]
+        time.sleep(0.001)
+    dt = time.perf_counter() - t0
+
+    loop.stop()
+    loop.join(timeout=1.0)
+    os.close(master)
+    os.close(slave)
+
+    t = np.concatenate(got_t) if got_t else np.empty(0)
+    assert got == expected, (got, expected)
+    assert np.all(np.diff(t) > 0)
+    return got / dt, session.malformed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    ang, t_ms = makeSamples(n)
+    text = asciiStream(ang, t_ms)
+    binary = encodeFrames(ang, t_ms)
+
+    ascii_bps = len(text) / n
+    print(f"muestras={n}")
+    print(f"  bytes/muestra  ascii={ascii_bps:.1f}  binario={FRAME_SIZE}")
+    print(f"  muestras/s a {BAUD} baud  ascii={BAUD / UART_BITS_PER_BYTE / ascii_bps:.0f}"
+          f"  binario={BAUD / UART_BITS_PER_BYTE / FRAME_SIZE:.0f}")
+
+    a = decodeRate(LineParser(), text, n)
+    b = decodeRate(FrameDecoder(), binary, n)
+    print(f"  decodificacion ascii   : {a:12,.0f} muestras/s")
+    print(f"  decodificacion binaria : {b:12,.0f} muestras/s  ({b / a:.1f}x)")
+
+    rate, bad = loopback(n)
+    print(f"  loopback pty binario   : {rate:12,.0f} muestras/s  (tramas corruptas detectadas: {bad})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Costo por cuadro de la decimación sobre ventanas de 1e5 a 1e7 puntos.
+
+    python benchmarks/bench_decimate.py [ancho_px] [cuadros]
+
+Simula el flujo real: en cada cuadro de 8 ms llegan las muestras nuevas,
+se recorta la ventana de 5 s y se decima la ventana completa.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decimate import ENGINES, Decimator
+from ringbuffer import SampleRing
+from session import WINDOW_SECONDS
+
+FRAME_SECONDS = 0.008
+
+
+def signal(t):
+    return 90.0 * np.sin(2.0 * np.pi * 1.3 * t) * np.exp(-0.1 * (t % 10.0)) + np.sin(t * 377.0)
+
+
+def run(n, engine, width, frames):
+    rate = n / WINDOW_SECONDS
+    per_frame = max(1, int(rate * FRAME_SECONDS))
+    ring = SampleRing(int(n * 1.1) + per_frame)
+    t = np.arange(n) / rate
+    ring.extend(t, signal(t), 0.0)
+    dec = Decimator(engine)
+    t_next = n
+
+    x, y, _ = ring.view()
+    c0 = time.perf_counter()
+    dec.decimate(x, y, ring.startIndex(), width)
+    first = time.perf_counter() - c0
+
+    costs = np.empty(frames)
+    for f in range(frames):
+        t = np.arange(t_next, t_next + per_frame) / rate
+        t_next += per_frame
+        ring.extend(t, signal(t), 0.0)
+        ring.trimBefore(t[-1] - WINDOW_SECONDS)
+        x, y, _ = ring.view()
+        c0 = time.perf_counter()
+        xs, _ = dec.decimate(x, y, ring.startIndex(), width)
+        costs[f] = time.perf_counter() - c0
+    return first, costs, xs.shape[0]
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1600
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"ancho={width}px cuadros={frames} presupuesto={FRAME_SECONDS * 1e3:.0f} ms")
+    for n in (10 ** 5, 10 ** 6, 10 ** 7):
+        for engine in ENGINES:
+            first, costs, pts = run(n, engine, width, frames)
+            p50, p99 = np.percentile(costs, [50, 99]) * 1e3
+            ok = "ok" if p99 < FRAME_SECONDS * 1e3 else "EXCEDE"
+            print(f"  n={n:>9,} {engine:>6}: p50={p50:6.2f} ms  p99={p99:6.2f} ms  "
+                  f"primer cuadro={first * 1e3:7.1f} ms  puntos={pts:5d}  {ok}")
+
+
+if __name__ == "__main__":
+    main()
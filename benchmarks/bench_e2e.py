@@ -0,0 +1,152 @@
+"""Benchmark de punta a punta: simulador en un pty -> MainWindow sin pantalla.
+
+    python benchmarks/bench_e2e.py --rates 1000,10000,20000 --seconds 10 [--binary]
+
+Por cada tasa mide muestras/s ingeridas, latencia desde que el simulador
+genera la muestra hasta que queda dibujada, tiempo de updatePlot (p50/p99),
+CPU% del proceso de la GUI y crecimiento de memoria. El simulador corre en
+otro proceso para que el CPU% sea solo el de la GUI.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+WARMUP_SECONDS = 1.0
+
+
+def simProcess(rate, conn, stop):
+    from simulator import Simulator
+    sim = Simulator(rate)
+    port = sim.open()
+    sim.start()
+    while sim.t_start is None:
+        time.sleep(0.001)
+    conn.send((port, sim.t_start))
+    stop.wait()
+    sim.stop()
+    sim.join(1.0)
+    conn.send(sim.produced)
+    sim.close()
+
+
+def rssMB():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def runOnce(app, rate, seconds, binary):
+    from pyqtgraph.Qt import QtCore
+    import main
+
+    parent, child = mp.Pipe()
+    stop = mp.Event()
+    proc = mp.Process(target=simProcess, args=(rate, child, stop), daemon=True)
+    proc.start()
+    port, t_start = parent.recv()
+
+    win = main.MainWindow([port], main.BAUD)
+    win.show()
+    session = win.sessions[0]
+    if binary:
+        win.cb_binary.setChecked(True)
+
+    frames = []
+    latency = []
+    rss = []
+    marks = {}
+    original = win.updatePlot
+
+    def timedUpdate():
+        c0 = time.perf_counter()
+        original()
+        frames.append(time.perf_counter() - c0)
+        if session.t0 is not None and len(session.history):
+            t_gen = t_start + session.t0 + session.history.lastTime()
+            latency.append(time.monotonic() - t_gen)
+
+    win.plotTimer.timeout.disconnect()
+    win.plotTimer.timeout.connect(timedUpdate)
+
+    def startMeasure():
+        frames.clear()
+        latency.clear()
+        marks['n0'] = len(session.pyramid)
+        marks['cpu0'] = time.process_time()
+        marks['wall0'] = time.perf_counter()
+        rss.append(rssMB())
+
+    def endMeasure():
+        marks['n1'] = len(session.pyramid)
+        marks['cpu1'] = time.process_time()
+        marks['wall1'] = time.perf_counter()
+        rss.append(rssMB())
+        app.quit()
+
+    memTimer = QtCore.QTimer()
+    memTimer.timeout.connect(lambda: rss.append(rssMB()) if 'wall0' in marks else None)
+    memTimer.start(1000)
+    QtCore.QTimer.singleShot(int(WARMUP_SECONDS * 1000), startMeasure)
+    QtCore.QTimer.singleShot(int((WARMUP_SECONDS + seconds) * 1000), endMeasure)
+    app.exec()
+    memTimer.stop()
+    win.plotTimer.stop()
+
+    stop.set()
+    produced = parent.recv()
+    proc.join(2.0)
+    win.close()
+
+    wall = marks['wall1'] - marks['wall0']
+    frame_ms = np.array(frames) * 1e3
+    latency_ms = np.array(latency) * 1e3
+    return {
+        'rate': rate,
+        'produced': produced,
+        'ingested_per_s': (marks['n1'] - marks['n0']) / wall,
+        'frame_ms': np.percentile(frame_ms, [50, 90, 99]) if frame_ms.size else [np.nan] * 3,
+        'latency_ms': np.percentile(latency_ms, [50, 99]) if latency_ms.size else [np.nan] * 2,
+        'cpu_pct': 100.0 * (marks['cpu1'] - marks['cpu0']) / wall,
+        'rss_mb': (rss[0], rss[-1]),
+        'rss_mb_per_min': (rss[-1] - rss[0]) / wall * 60.0,
+        'dropped': session.dropped_batches,
+        'malformed': session.malformed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rates', default='1000,5000,20000')
+    ap.add_argument('--seconds', type=float, default=10.0)
+    ap.add_argument('--binary', action='store_true')
+    args = ap.parse_args()
+
+    import pyqtgraph as pg
+    from pyqtgraph.Qt import QtWidgets
+    app = QtWidgets.QApplication(sys.argv[:1])
+    pg.setConfigOptions(antialias=False, useOpenGL=False)
+
+    print(f"duracion={args.seconds:g}s {'binario' if args.binary else 'ascii'}")
+    for rate in (float(r) for r in args.rates.split(',')):
+        r = runOnce(app, rate, args.seconds, args.binary)
+        f50, f90, f99 = r['frame_ms']
+        l50, l99 = r['latency_ms']
+        print(f"  tasa={rate:>8,.0f}/s  ingeridas={r['ingested_per_s']:>9,.0f}/s  "
+              f"updatePlot p50/p90/p99={f50:.2f}/{f90:.2f}/{f99:.2f} ms  "
+              f"latencia p50/p99={l50:.1f}/{l99:.1f} ms  CPU={r['cpu_pct']:.0f}%  "
+              f"RSS={r['rss_mb'][0]:.0f}->{r['rss_mb'][1]:.0f} MB ({r['rss_mb_per_min']:+.1f} MB/min)  "
+              f"lotes perdidos={r['dropped']} invalidas={r['malformed']}")
+
+
+if __name__ == "__main__":
+    mp.set_start_method('spawn')
+    main()
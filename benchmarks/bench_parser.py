@@ -0,0 +1,77 @@
+"""Líneas/s del parser por lotes contra el camino anterior línea por línea.
+
+    python benchmarks/bench_parser.py [n_lineas] [tam_chunk]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from telemetry import LineParser, parseLine
+
+
+def makeStream(n, mixed=False):
+    rows = []
+    for i in range(n):
+        if mixed and i % 2:
+            rows.append(f"{(i * 0.37) % 360:.2f},{i * 2}\n")
+        else:
+            rows.append(f"{(i * 0.37) % 360:.2f},{i % 255},{i * 2}\n")
+    return ''.join(rows).encode('utf-8')
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def perLine(parts):
+    rx_buf = bytearray()
+    out = []
+    for chunk in parts:
+        rx_buf.extend(chunk)
+        while True:
+            nl = rx_buf.find(b'\n')
+            if nl < 0:
+                break
+            line = rx_buf[:nl]
+            del rx_buf[:nl + 1]
+            sample = parseLine(line)
+            if sample is not None:
+                out.append(sample)
+    return len(out)
+
+
+def batched(parts):
+    parser = LineParser()
+    total = 0
+    for chunk in parts:
+        t, _ = parser.feed(chunk)
+        total += t.shape[0]
+    return total
+
+
+def bench(fn, parts, n_lines, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        got = fn(parts)
+        best = min(best, time.perf_counter() - t0)
+    assert got == n_lines, (fn.__name__, got, n_lines)
+    return n_lines / best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 65536
+    for mixed in (False, True):
+        parts = chunks(makeStream(n, mixed), size)
+        a = bench(perLine, parts, n)
+        b = bench(batched, parts, n)
+        print(f"lineas={n} chunk={size}B {'2/3 campos' if mixed else '3 campos'}")
+        print(f"  por linea : {a:12,.0f} lineas/s")
+        print(f"  por lotes : {b:12,.0f} lineas/s  ({b / a:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
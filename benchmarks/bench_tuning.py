@@ -0,0 +1,120 @@
+"""Identificación + barrido de ganancias sobre una sesión sintética.
+
+    python benchmarks/bench_tuning.py [n_combinaciones] [--workers N]
+
+Genera una sesión con la planta y el firmware del simulador (tramos en lazo
+abierto y escalones en lazo cerrado), la graba con SessionRecorder,
+identifica el modelo y lo compara con los parámetros reales. Después barre
+~n combinaciones kp/ki/kd y contrasta la respuesta simulada con las
+ganancias de fábrica contra StepTracker sobre la planta "real".
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from recorder import SessionLog, SessionRecorder
+from firmware import CONTROL_PERIOD, FIRMWARE_PID, PWM_MAX
+from simulator import Firmware, MotorPlant
+from stepmetrics import StepTracker
+import tuning
+
+RATE = 1000.0
+OPEN_LOOP = [(80.0, 0.6), (-120.0, 0.6), (40.0, 0.8)]
+CLOSED_LOOP = [(90.0, 2.0), (0.0, 2.0), (-45.0, 2.0)]
+
+
+def runPlant(plant, firmware, program, t0=0.0):
+    """program: [(ref, segundos)] -> t, ang, ref por muestra a RATE."""
+    dt = 1.0 / RATE
+    per_control = int(round(CONTROL_PERIOD * RATE))
+    t, ang, ref = [], [], []
+    u = 0.0
+    k = 0
+    for r, seconds in program:
+        firmware.ref = r
+        for _ in range(int(seconds * RATE)):
+            if k % per_control == 0:
+                u = firmware.control(plant.theta) / PWM_MAX
+            k += 1
+            t.append(t0 + k * dt)
+            ang.append(plant.step(u, dt))
+            ref.append(r)
+    return np.array(t), np.array(ang), np.array(ref)
+
+
+def makeSession(path):
+    plant, fw = MotorPlant(), Firmware()
+    rec = SessionRecorder(path, mode=1, pid=list(FIRMWARE_PID))
+    rec.start()
+    fw.handle("m=1")
+    t, ang, ref = runPlant(plant, fw, OPEN_LOOP)
+    rec.addSamples(t, ang, ref)
+
+    fw.handle("m=0")
+    rec.addCommand(t[-1], "m=0")
+    t2, ang2, ref2 = runPlant(plant, fw, CLOSED_LOOP, t0=t[-1])
+    rec.addSamples(t2, ang2, ref2)
+    rec.stop()
+    rec.join()
+    return plant
+
+
+def firmwareStep(step):
+    """Escalón 0 -> step con las ganancias de fábrica medido con StepTracker."""
+    t, ang, ref = runPlant(MotorPlant(), Firmware(), [(0.0, 0.1), (step, tuning.SIM_SECONDS)])
+    tracker = StepTracker()
+    tracker.update(t, ang, ref, FIRMWARE_PID)
+    return tracker.steps[-1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('n', type=int, nargs='?', default=100000)
+    ap.add_argument('--workers', type=int)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plant = makeSession(os.path.join(tmp, 'eje'))
+        t0 = time.perf_counter()
+        model = tuning.identify(SessionLog(os.path.join(tmp, 'eje')))
+        t_ident = time.perf_counter() - t0
+
+    print(f"identificacion ({t_ident:.2f} s)")
+    print(f"  real     K={plant.gain / PWM_MAX:.4f} °/s/PWM  tau={plant.tau:.4f} s  L=0")
+    print(f"  estimado K={model.gain:.4f} °/s/PWM  tau={model.tau:.4f} s  L={model.delay:.3f} s"
+          f"  rmse={model.rmse:.3f}°")
+
+    side = round(args.n ** (1 / 3))
+    kp, ki, kd = tuning.gainGrid((0.5, 10.0, side), (0.0, 0.5, side), (0.0, 15.0, side))
+    kp = np.concatenate(([FIRMWARE_PID[0]], kp))
+    ki = np.concatenate(([FIRMWARE_PID[1]], ki))
+    kd = np.concatenate(([FIRMWARE_PID[2]], kd))
+
+    t0 = time.perf_counter()
+    res = tuning.sweep(model, kp, ki, kd, step=90.0, workers=args.workers)
+    dt = time.perf_counter() - t0
+    print(f"barrido: {kp.shape[0]:,} combinaciones en {dt:.2f} s con {args.workers or os.cpu_count()} procesos"
+          f"  ({kp.shape[0] / dt:,.0f}/s)")
+
+    real = firmwareStep(90.0)
+    print("ganancias de fabrica   subida  sobrepaso  establec.   IAE")
+    print(f"  planta + StepTracker  {real['rise']:.3f}  {real['overshoot']:8.1f}%  "
+          f"{real['settling'] or float('nan'):8.3f}  {real['iae']:6.2f}")
+    print(f"  modelo + barrido      {res['rise'][0]:.3f}  {res['overshoot'][0]:8.1f}%  "
+          f"{res['settling'][0]:8.3f}  {res['iae'][0]:6.2f}")
+
+    print("mejores por IAE:")
+    for i in tuning.rank(res, 'iae', top=5):
+        print(f"  kp={res['kp'][i]:.3f} ki={res['ki'][i]:.3f} kd={res['kd'][i]:.3f}  "
+              f"subida={res['rise'][i]:.3f}s sobrepaso={res['overshoot'][i]:.1f}% "
+              f"establec={res['settling'][i]:.3f}s IAE={res['iae'][i]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Telemetría binaria: tramas fijas little-endian con sincronía y CRC-16.
+
+Trama (12 bytes):
+    sync  u16  0x5AA5 (bytes A5 5A)
+    ang   f32  ángulo en grados
+    t     u32  tiempo del firmware en ms
+    crc   u16  CRC-16/CCITT-FALSE de los 10 bytes anteriores
+
+Se activa con "b=1\\n" y se vuelve a ASCII con "b=0\\n".
+"""
+import numpy as np
+
+SYNC = b'\xa5\x5a'
+SYNC_WORD = 0x5AA5
+
+FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('ang', '<f4'),
+    ('t', '<u4'),
+    ('crc', '<u2'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+CRC_SPAN = FRAME_SIZE - 2
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+def _crcTable():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _crcTable()
+
+
+def crc16Rows(rows):
+    """CRC-16 de cada fila de una matriz uint8 (n, k), vectorizado por columna."""
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for j in range(rows.shape[1]):
+        crc = (crc << 8) ^ CRC_TABLE[(crc >> 8) ^ rows[:, j]]
+    return crc
+
+
+def encodeFrames(ang, t_ms) -> bytes:
+    """Codificador de referencia (lo mismo que hace el firmware)."""
+    ang = np.asarray(ang, dtype=np.float32)
+    frames = np.zeros(ang.shape[0], dtype=FRAME_DTYPE)
+    frames['sync'] = SYNC_WORD
+    frames['ang'] = ang
+    frames['t'] = np.asarray(t_ms, dtype=np.uint32)
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    frames['crc'] = crc16Rows(raw[:, :CRC_SPAN])
+    return frames.tobytes()
+
+
+class FrameDecoder:
+    """Decodifica tramas en bloque y se resincroniza ante bytes corruptos.
+
+    Misma interfaz que `telemetry.LineParser`: `feed(chunk)` -> (t_s, ang).
+    """
+
+    def __init__(self):
+        self._partial = b''
+        self.frames = 0
+        self.malformed = 0
+        self.skipped = 0
+
+    def feed(self, chunk):
+        buf = self._partial + bytes(chunk) if self._partial else bytes(chunk)
+        out = []
+        i = 0
+        while True:
+            j = buf.find(SYNC, i)
+            if j < 0:
+                # un A5 suelto al final puede ser el inicio de la próxima sincronía
+                keep = 1 if i < len(buf) and buf.endswith(SYNC[:1]) else 0
+                self.skipped += len(buf) - i - keep
+                i = len(buf) - keep
+                break
+            self.skipped += j - i
+            n = (len(buf) - j) // FRAME_SIZE
+            if n == 0:
+                i = j
+                break
+
+            frames = np.frombuffer(buf, dtype=FRAME_DTYPE, count=n, offset=j)
+            rows = np.frombuffer(buf, dtype=np.uint8, count=n * FRAME_SIZE, offset=j)
+            rows = rows.reshape(n, FRAME_SIZE)
+            good = (frames['sync'] == SYNC_WORD) & (crc16Rows(rows[:, :CRC_SPAN]) == frames['crc'])
+            bad = np.flatnonzero(~good)
+            m = int(bad[0]) if bad.shape[0] else n
+            if m:
+                out.append(frames[:m])
+            if m == n:
+                i = j + n * FRAME_SIZE
+                continue
+            # trama inválida: se avanza un byte y se busca la siguiente sincronía
+            self.malformed += 1
+            i = j + m * FRAME_SIZE + 1
+            self.skipped += 1
+
+        self._partial = buf[i:]
+        if not out:
+            return _EMPTY, _EMPTY
+        frames = out[0] if len(out) == 1 else np.concatenate(out)
+        self.frames += frames.shape[0]
+        return frames['t'].astype(np.float64) / 1000.0, frames['ang'].astype(np.float64)
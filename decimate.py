@@ -0,0 +1,143 @@
+"""Decimación para dibujar la ventana visible sin perder picos.
+
+Motores:
+    minmax  envolvente mínimo/máximo por columna de píxel (2 puntos por bucket)
+    lttb    Largest-Triangle-Three-Buckets; el ancla de cada bucket es el
+            promedio del bucket anterior en vez del punto elegido, lo que
+            permite vectorizarlo
+    stride  muestreo cada `step` puntos (el comportamiento anterior)
+
+Los buckets tienen tamaño potencia de dos y están alineados al índice
+absoluto de la muestra (`SampleRing.startIndex()`), así los buckets ya
+completos se guardan entre cuadros y solo se reduce lo que llegó nuevo.
+"""
+import numpy as np
+
+ENGINES = ('minmax', 'lttb', 'stride')
+
+
+def _minMaxRange(y, k, c0, c1, start):
+    s = c0 * k - start
+    body = y[s:s + (c1 - c0) * k].reshape(c1 - c0, k)
+    imin = body.argmin(axis=1)
+    imax = body.argmax(axis=1)
+    base = np.arange(c0, c1, dtype=np.int64) * k
+    idx = np.empty((c1 - c0, 2), dtype=np.int64)
+    np.minimum(imin, imax, out=idx[:, 0])
+    np.maximum(imin, imax, out=idx[:, 1])
+    idx += base[:, None]
+    return idx.ravel()
+
+
+def _minMaxPartial(y, lo, hi, start):
+    if hi <= lo:
+        return np.empty(0, dtype=np.int64)
+    seg = y[lo - start:hi - start]
+    a = int(seg.argmin())
+    b = int(seg.argmax())
+    return np.array(sorted((a, b)), dtype=np.int64) + lo
+
+
+def _lttbRange(x, y, k, c0, c1, b_lo, b_hi, start):
+    lo = max(c0 - 1, b_lo)
+    hi = min(c1 + 1, b_hi)
+    s = lo * k - start
+    bx = x[s:s + (hi - lo) * k].reshape(hi - lo, k)
+    by = y[s:s + (hi - lo) * k].reshape(hi - lo, k)
+    mx = bx.mean(axis=1)
+    my = by.mean(axis=1)
+
+    i0 = c0 - lo
+    i1 = c1 - lo
+    px = bx[i0:i1]
+    py = by[i0:i1]
+
+    ax = np.empty(c1 - c0)
+    ay = np.empty(c1 - c0)
+    ax[1:] = mx[i0:i1 - 1]
+    ay[1:] = my[i0:i1 - 1]
+    if c0 > b_lo:
+        ax[0], ay[0] = mx[i0 - 1], my[i0 - 1]
+    else:
+        ax[0], ay[0] = x[0], y[0]
+
+    cx = np.empty(c1 - c0)
+    cy = np.empty(c1 - c0)
+    cx[:-1] = mx[i0 + 1:i1]
+    cy[:-1] = my[i0 + 1:i1]
+    if c1 < b_hi:
+        cx[-1], cy[-1] = mx[i1], my[i1]
+    else:
+        cx[-1], cy[-1] = x[-1], y[-1]
+
+    area = np.abs((ax - cx)[:, None] * (py - ay[:, None])
+                  - (ax[:, None] - px) * (cy - ay)[:, None])
+    return area.argmax(axis=1) + np.arange(c0, c1, dtype=np.int64) * k
+
+
+class Decimator:
+    """Decima una serie (x, y) que crece por el final; una instancia por curva."""
+
+    def __init__(self, engine='minmax'):
+        self.engine = engine
+        self.reset()
+
+    def setEngine(self, engine):
+        if engine not in ENGINES:
+            raise ValueError(f"motor de decimación desconocido: {engine}")
+        self.engine = engine
+        self.reset()
+
+    def reset(self):
+        self._k = 0
+        self._b0 = 0
+        self._idx = np.empty(0, dtype=np.int64)
+
+    def decimate(self, x, y, start, n_cols):
+        n = y.shape[0]
+        n_cols = max(1, int(n_cols))
+        if n <= 2 * n_cols:
+            return x, y
+        if self.engine == 'stride':
+            step = max(1, n // n_cols)
+            return x[::step], y[::step]
+
+        k = 1 << int(np.ceil(np.log2(n / n_cols)))
+        if k != self._k:
+            self.reset()
+            self._k = k
+
+        end = start + n
+        b_lo = -(-start // k)
+        b_hi = end // k
+        minmax = self.engine == 'minmax'
+        per = 2 if minmax else 1
+
+        cached_hi = self._b0 + self._idx.shape[0] // per
+        if self._b0 > b_lo or cached_hi <= b_lo:
+            self._b0 = b_lo
+            self._idx = self._idx[:0]
+            cached_hi = b_lo
+        elif self._b0 < b_lo:
+            self._idx = self._idx[(b_lo - self._b0) * per:]
+            self._b0 = b_lo
+
+        # en LTTB el último bucket completo depende del siguiente, que aún crece
+        stable_hi = b_hi if minmax else b_hi - 1
+        if stable_hi > cached_hi:
+            if minmax:
+                new = _minMaxRange(y, k, cached_hi, stable_hi, start)
+            else:
+                new = _lttbRange(x, y, k, cached_hi, stable_hi, b_lo, b_hi, start)
+            self._idx = np.concatenate((self._idx, new))
+
+        if minmax:
+            head = _minMaxPartial(y, start, b_lo * k, start)
+            tail = _minMaxPartial(y, b_hi * k, end, start)
+            idx = np.concatenate((head, self._idx, tail))
+        else:
+            last = _lttbRange(x, y, k, b_hi - 1, b_hi, b_lo, b_hi, start)
+            idx = np.concatenate(([start], self._idx, last, [end - 1]))
+
+        idx -= start
+        return x[idx], y[idx]
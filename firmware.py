@@ -0,0 +1,9 @@
+"""Constantes del firmware del controlador, compartidas por la GUI, el
+simulador y el barrido de ganancias."""
+
+# periodo del lazo de control en la placa (s)
+CONTROL_PERIOD = 0.01
+# salida del PID saturada a ±PWM_MAX
+PWM_MAX = 255.0
+# ganancias (kp, ki, kd) con las que arranca hasta recibir un kp/ki/kd
+FIRMWARE_PID = (3.05, 0.1, 4.6)
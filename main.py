@@ -1,33 +1,445 @@
+import argparse
+import math
+import os
 import sys
+import time
 import serial
-from collections import deque
 
 import pyqtgraph as pg
 from pyqtgraph.Qt import QtWidgets, QtCore
 
+from decimate import Decimator
+from recorder import REPLAY_SPEEDS, ReplaySource, SessionRecorder
+from firmware import FIRMWARE_PID
+from session import MAX_POINTS, WINDOW_SECONDS, DeviceSession, IOLoop
+from stepmetrics import SETTLING_BAND
+import tuning
+
 PORT = 'COM5'
 BAUD = 9600
-WINDOW_SECONDS = 5.0
-MAX_POINTS = 3000
-DOWNSAMPLE_TARGET = 1200
+MIN_PLOT_COLUMNS = 200
+SESSIONS_DIR = 'sesiones'
+DECIMATION_ENGINES = [("min/máx", 'minmax'), ("LTTB", 'lttb'), ("Salto", 'stride')]
+STATS_REFRESH_MS = 500
+STEP_COLUMNS = [
+    ("t (s)", 't_step', "{:.2f}"), ("Ref (°)", 'ref', "{:g}"), ("Escalón (°)", 'size', "{:.1f}"),
+    ("kp", 'kp', "{:g}"), ("ki", 'ki', "{:g}"), ("kd", 'kd', "{:g}"),
+    ("Subida (s)", 'rise', "{:.3f}"), ("Sobrepaso (%)", 'overshoot', "{:.1f}"),
+    ("Establec. (s)", 'settling', "{:.3f}"), ("e_ss (°)", 'ess', "{:.2f}"),
+    ("IAE", 'iae', "{:.2f}"), ("ISE", 'ise', "{:.1f}"), ("ITAE", 'itae', "{:.2f}"),
+]
+
+TUNING_GRID = [("kp", 0.5, 10.0, 50), ("ki", 0.0, 0.5, 40), ("kd", 0.0, 15.0, 50)]
+TUNING_TOP = 20
+TUNING_COLUMNS = [
+    ("kp", 'kp', "{:.3f}"), ("ki", 'ki', "{:.3f}"), ("kd", 'kd', "{:.3f}"),
+    ("Subida (s)", 'rise', "{:.3f}"), ("Sobrepaso (%)", 'overshoot', "{:.1f}"),
+    ("Establec. (s)", 'settling', "{:.3f}"), ("IAE", 'iae', "{:.2f}"),
+]
+RANK_LABELS = [("IAE", 'iae'), ("Establecimiento", 'settling'), ("Sobrepaso", 'overshoot')]
+
+
+def fmt(value, spec):
+    return "—" if value is None else spec.format(value)
+
+
+def replayPath(path, name):
+    """Carpeta de un eje grabado; de una carpeta sesiones/<fecha>/ toma el eje `name`."""
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+    axes = [d for d in sorted(os.listdir(path))
+            if os.path.exists(os.path.join(path, d, 'meta.json'))]
+    name = name[len('replay_'):] if name.startswith('replay_') else name
+    if name in axes:
+        return os.path.join(path, name)
+    if len(axes) == 1:
+        return os.path.join(path, axes[0])
+    if not axes:
+        raise ValueError(f"{path} no es una sesión grabada")
+    raise ValueError(f"{path} tiene varios ejes ({', '.join(axes)}); elegir uno")
+
+
+class AxisPlot(pg.PlotWidget):
+    def __init__(self, session, title="Ángulo vs Tiempo"):
+        super().__init__(background="#0e1116")
+        self.session = session
+        self.setTitle(title, color="#e0e0e0")
+        self.setLabel('left', 'Ángulo / Referencia (°)')
+        self.setLabel('bottom', 'Tiempo (s)')
+        self.showGrid(x=True, y=True, alpha=0.2)
+        self.setYRange(-360.0, 360.0)
+
+        self.curve_angle = self.plot([], [], pen=pg.mkPen('#4da3ff', width=2))
+        self.curve_ref   = self.plot([], [], pen=pg.mkPen('#ff5555', width=2, style=QtCore.Qt.DashLine))
+
+        self.decim_angle = Decimator()
+        self.decim_ref = Decimator()
+        self.following = True
+        self._live_dirty = False
+        self._history_dirty = False
+        self._history_drawn_t = None
+
+        vb = self.getPlotItem().getViewBox()
+        vb.sigRangeChangedManually.connect(self.onUserRange)
+        vb.sigXRangeChanged.connect(self.onXRangeChanged)
+
+        self.overlay = QtWidgets.QLabel(self)
+        self.overlay.setStyleSheet("""
+            background-color: rgba(14, 17, 22, 200);
+            color: #e0e0e0;
+            border: 1px solid #555;
+            font-family: monospace;
+            font-size: 10px;
+            padding: 4px;
+        """)
+        self.overlay.move(70, 30)
+        self.overlay.hide()
+        self._overlay_shape = None
+
+    def showStats(self, text):
+        self.overlay.setText(text)
+        # fuente monoespaciada: adjustSize (caro) solo si cambian líneas o ancho
+        lines = text.split('\n')
+        shape = (len(lines), max(map(len, lines)))
+        if shape != self._overlay_shape:
+            self._overlay_shape = shape
+            self.overlay.adjustSize()
+            self.overlay.raise_()
+
+    def setSession(self, session):
+        self.session = session
+        self.followLive()
+        self._history_drawn_t = None
+        self.curve_angle.setData([], [])
+        self.curve_ref.setData([], [])
+
+    def setEngine(self, engine):
+        self.decim_angle.setEngine(engine)
+        self.decim_ref.setEngine(engine)
+
+    def onUserRange(self, *args):
+        self.following = False
+        self._history_dirty = True
+
+    def onXRangeChanged(self, *args):
+        if not self.following:
+            self._history_dirty = True
+
+    def followLive(self):
+        self.following = True
+        # aunque no lleguen datos, se vuelve a dibujar la ventana en vivo
+        self._live_dirty = True
+        self.decim_angle.reset()
+        self.decim_ref.reset()
+
+    def render(self, n_new: int) -> bool:
+        history = self.session.history
+        if not len(history):
+            return False
+
+        if not self.following:
+            return self.renderHistory(n_new)
+        if not (n_new or self._live_dirty):
+            return False
+        self._live_dirty = False
+
+        x, y, y_ref = history.view()
+        start = history.startIndex()
+        n_cols = max(MIN_PLOT_COLUMNS, self.getPlotItem().getViewBox().width())
+
+        self.curve_angle.setData(*self.decim_angle.decimate(x, y, start, n_cols))
+        self.curve_ref.setData(*self.decim_ref.decimate(x, y_ref, start, n_cols))
+        self.setXRange(x[0], x[-1], padding=0)
+        return True
+
+    def renderHistory(self, n_new: int) -> bool:
+        vb = self.getPlotItem().getViewBox()
+        (x0, x1), _ = vb.viewRange()
+        t_last = self.session.history.lastTime()
+        new_in_view = n_new and x1 >= (self._history_drawn_t or 0.0)
+        if not (self._history_dirty or new_in_view):
+            return False
+
+        n_cols = max(MIN_PLOT_COLUMNS, vb.width())
+        x, y, y_ref = self.session.pyramid.query(x0, x1, n_cols)
+        self.curve_angle.setData(x, y)
+        self.curve_ref.setData(x, y_ref)
+        self._history_dirty = False
+        self._history_drawn_t = t_last
+        return True
+
+
+class StepTable(QtWidgets.QDialog):
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner
+        self.resize(820, 300)
+
+        self.table = QtWidgets.QTableWidget(0, len(STEP_COLUMNS))
+        self.table.setHorizontalHeaderLabels([c[0] for c in STEP_COLUMNS])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.table)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self._tracker = None
+        self._shown = []
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start(STATS_REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        # los escalones solo se agregan al final (y se descartan del principio
+        # pasado MAX_STEPS): se agregan las filas nuevas y se actualiza la
+        # última, la única que puede seguir abierta
+        s = self.owner.current
+        self.setWindowTitle(f"Escalones — {s.name}")
+        steps = list(s.metrics.steps)
+        if s.metrics is not self._tracker:
+            self._tracker = s.metrics
+            self._shown = []
+            self.table.setRowCount(0)
+        drop = len(self._shown)
+        if steps:
+            drop = next((k for k, step in enumerate(self._shown) if step is steps[0]), drop)
+        for _ in range(drop):
+            self.table.removeRow(0)
+        del self._shown[:drop]
+
+        first = max(0, len(self._shown) - 1)
+        self.table.setRowCount(len(steps))
+        for row in range(first, len(steps)):
+            for col, (_, key, spec) in enumerate(STEP_COLUMNS):
+                text = fmt(steps[row][key], spec)
+                item = self.table.item(row, col)
+                if item is None:
+                    self.table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+        self._shown = steps
+
+
+class TuningDialog(QtWidgets.QDialog):
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner
+        self.setWindowTitle("Sintonía fuera de línea")
+        self.resize(760, 480)
+
+        self.model = None
+        self.results = None
+        self.rows = []
+        self.executor = None
+        self.job = None
+        self._t_job = 0.0
+
+        sessionRow = QtWidgets.QHBoxLayout()
+        self.sessionBtn = QtWidgets.QPushButton("Sesión…")
+        self.modelLabel = QtWidgets.QLabel("Elegir una sesión grabada (lazo abierto m=1 y/o escalones en lazo cerrado)")
+        sessionRow.addWidget(self.sessionBtn)
+        sessionRow.addWidget(self.modelLabel, 1)
+
+        gridRow = QtWidgets.QHBoxLayout()
+        self.gridEdits = []
+        for name, lo, hi, n in TUNING_GRID:
+            edits = [QtWidgets.QLineEdit(f"{v:g}") for v in (lo, hi, n)]
+            gridRow.addWidget(QtWidgets.QLabel(f"{name}:"))
+            for e in edits:
+                e.setFixedWidth(50)
+                gridRow.addWidget(e)
+            gridRow.addSpacing(10)
+            self.gridEdits.append(edits)
+        gridRow.addStretch(1)
+
+        simRow = QtWidgets.QHBoxLayout()
+        self.stepEdit = QtWidgets.QLineEdit("90")
+        self.stepEdit.setFixedWidth(60)
+        self.secondsEdit = QtWidgets.QLineEdit(f"{tuning.SIM_SECONDS:g}")
+        self.secondsEdit.setFixedWidth(60)
+        self.rankCombo = QtWidgets.QComboBox()
+        for label, key in RANK_LABELS:
+            self.rankCombo.addItem(label, key)
+        self.sweepBtn = QtWidgets.QPushButton("Barrer")
+        self.sweepBtn.setEnabled(False)
+        self.jobLabel = QtWidgets.QLabel("")
+        simRow.addWidget(QtWidgets.QLabel("Escalón (°):"))
+        simRow.addWidget(self.stepEdit)
+        simRow.addWidget(QtWidgets.QLabel("Horizonte (s):"))
+        simRow.addWidget(self.secondsEdit)
+        simRow.addWidget(QtWidgets.QLabel("Ordenar por:"))
+        simRow.addWidget(self.rankCombo)
+        simRow.addWidget(self.sweepBtn)
+        simRow.addWidget(self.jobLabel, 1)
+
+        self.table = QtWidgets.QTableWidget(0, len(TUNING_COLUMNS))
+        self.table.setHorizontalHeaderLabels([c[0] for c in TUNING_COLUMNS])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.loadBtn = QtWidgets.QPushButton("Cargar en kp/ki/kd")
+        self.loadBtn.setEnabled(False)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(sessionRow)
+        layout.addLayout(gridRow)
+        layout.addLayout(simRow)
+        layout.addWidget(self.table, 1)
+        layout.addWidget(self.loadBtn)
+
+        self.sessionBtn.clicked.connect(self.onSession)
+        self.sweepBtn.clicked.connect(self.onSweep)
+        self.rankCombo.currentIndexChanged.connect(self.showRanking)
+        self.table.itemSelectionChanged.connect(lambda: self.loadBtn.setEnabled(bool(self.table.selectedItems())))
+        self.table.cellDoubleClicked.connect(self.onLoad)
+        self.loadBtn.clicked.connect(self.onLoad)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.pollJob)
+
+    def _submit(self, kind, futures):
+        self.job = (kind, futures)
+        self._t_job = time.perf_counter()
+        self.sessionBtn.setEnabled(False)
+        self.sweepBtn.setEnabled(False)
+        self.timer.start(50)
+
+    def _pool(self):
+        if self.executor is None:
+            self.executor = tuning.makeExecutor()
+        return self.executor
+
+    def onSession(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, "Sesión de un eje", SESSIONS_DIR)
+        if not path:
+            return
+        try:
+            path = replayPath(path, self.owner.current.name)
+        except (OSError, ValueError) as e:
+            self.modelLabel.setText(f"No se pudo abrir la sesión: {e}")
+            return
+        self.modelLabel.setText(f"Identificando {path}…")
+        self._submit('identify', [self._pool().submit(tuning.identifyPath, path)])
+
+    def onSweep(self):
+        try:
+            ranges = [tuple(float(e.text()) for e in edits) for edits in self.gridEdits]
+            step = float(self.stepEdit.text())
+            seconds = float(self.secondsEdit.text())
+        except ValueError:
+            self.jobLabel.setText("Valores inválidos")
+            return
+        if not math.isfinite(step) or step == 0:
+            self.jobLabel.setText("El escalón debe ser finito y distinto de 0")
+            return
+        if not 0 < seconds <= tuning.MAX_SIM_SECONDS:
+            self.jobLabel.setText(f"La duración debe estar entre 0 y {tuning.MAX_SIM_SECONDS:g} s")
+            return
+        try:
+            kp, ki, kd = tuning.gainGrid(*ranges)
+        except ValueError as e:
+            self.jobLabel.setText(f"Grilla inválida: {e}")
+            return
+
+        band = self.owner.bandSpin.value() / 100.0
+        self.jobLabel.setText(f"Simulando {kp.shape[0]:,} combinaciones…")
+        self._submit('sweep', tuning.submitSweep(self._pool(), self.model, kp, ki, kd, step, seconds, band))
+
+    def pollJob(self):
+        kind, futures = self.job
+        done = sum(f.done() for f in futures)
+        if done < len(futures):
+            if kind == 'sweep':
+                self.jobLabel.setText(f"Simulando… {done}/{len(futures)} bloques")
+            return
+
+        self.timer.stop()
+        self.job = None
+        self.sessionBtn.setEnabled(True)
+        elapsed = time.perf_counter() - self._t_job
+        try:
+            if kind == 'identify':
+                self.model = futures[0].result()
+                m = self.model
+                self.modelLabel.setText(f"K={m.gain:.4g} °/s/PWM   τ={m.tau:.4g} s   L={m.delay:.3g} s   "
+                                        f"RMSE={m.rmse:.2f}°")
+            else:
+                self.results = tuning.gather(futures)
+                n = self.results['kp'].shape[0]
+                self.jobLabel.setText(f"{n:,} combinaciones en {elapsed:.2f} s")
+                self.showRanking()
+        except Exception as e:
+            label = self.modelLabel if kind == 'identify' else self.jobLabel
+            label.setText(f"Error: {e}")
+        self.sweepBtn.setEnabled(self.model is not None)
+
+    def showRanking(self):
+        if self.results is None:
+            return
+        res = self.results
+        self.rows = tuning.rank(res, self.rankCombo.currentData(), top=TUNING_TOP)
+        self.table.setRowCount(len(self.rows))
+        for row, i in enumerate(self.rows):
+            for col, (_, key, spec) in enumerate(TUNING_COLUMNS):
+                self.table.setItem(row, col, QtWidgets.QTableWidgetItem(fmt(res[key][i], spec)))
+
+    def onLoad(self, *args):
+        items = self.table.selectedItems()
+        if not items:
+            return
+        i = self.rows[items[0].row()]
+        res = self.results
+        self.owner.kpEdit.setText(f"{res['kp'][i]:.4g}")
+        self.owner.kiEdit.setText(f"{res['ki'][i]:.4g}")
+        self.owner.kdEdit.setText(f"{res['kd'][i]:.4g}")
+        self.owner.status.setText("Ganancias cargadas; revisar y Enviar PID")
+
+    def shutdown(self):
+        self.timer.stop()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
 
 class MainWindow(QtWidgets.QWidget):
-    def __init__(self):
+    def __init__(self, ports=(PORT,), baud=BAUD):
         super().__init__()
         self.setWindowTitle("Control de posición")
         self.resize(900, 580)
 
-        self.current_error = 0.0
-
-        try:
-            self.ser = serial.Serial(PORT, BAUD, timeout=0.0)
-        except serial.SerialException as e:
-            self.ser = None
-            print(f"[WARN] No se pudo abrir {PORT}: {e}")
+        if isinstance(ports, str):
+            ports = [ports]
+        self.baud = baud
+
+        self.sessions = []
+        self.ioloop = IOLoop()
+        for port in ports:
+            s = DeviceSession(port, baud, capacity=MAX_POINTS, window=WINDOW_SECONDS)
+            try:
+                s.open()
+                self.ioloop.add(s)
+            except serial.SerialException as e:
+                # onDeviceChanged lo muestra en la barra de estado
+                s.error = e
+            self.sessions.append(s)
 
         top = QtWidgets.QVBoxLayout()
 
         refRow = QtWidgets.QHBoxLayout()
+        self.deviceCombo = QtWidgets.QComboBox()
+        for s in self.sessions:
+            self.deviceCombo.addItem(s.name)
+        self.deviceLabel = QtWidgets.QLabel("Eje:")
+        if len(self.sessions) < 2:
+            self.deviceLabel.hide()
+            self.deviceCombo.hide()
         lbl = QtWidgets.QLabel("Referencia (°):")
         self.refEdit = QtWidgets.QLineEdit("0.0")
         self.refEdit.setFixedWidth(80)
@@ -36,35 +448,47 @@ class MainWindow(QtWidgets.QWidget):
         self.referencia = QtWidgets.QLabel("Referencia: 0")
         self.status = QtWidgets.QLabel("Listo")
         self.status.setStyleSheet("color: #56DB14;")
+        self.angleLabel = QtWidgets.QLabel("Angulo Real —")
+        self.angleLabel.setStyleSheet("color: #fff;")
         self.referencia.setStyleSheet("color: #fff;")
 
+        refRow.addWidget(self.deviceLabel)
+        refRow.addWidget(self.deviceCombo)
         refRow.addWidget(lbl)
         refRow.addWidget(self.refEdit)
         refRow.addWidget(self.sendBtn)
         refRow.addSpacing(15)
         refRow.addWidget(self.status, 1)
+        refRow.addWidget(self.angleLabel, 1)
         refRow.addWidget(self.referencia, 2)
 
+        self.dropLabel = QtWidgets.QLabel("")
+        self.dropLabel.setStyleSheet("color: #ff6b6b;")
+        self.dropLabel.hide()
+        refRow.addWidget(self.dropLabel)
+
         top.addLayout(refRow)
 
         pidRow = QtWidgets.QHBoxLayout()
         pidRow.addWidget(QtWidgets.QLabel("kp:"))
-        self.kpEdit = QtWidgets.QLineEdit("3.05")
+        self.kpEdit = QtWidgets.QLineEdit(f"{FIRMWARE_PID[0]:g}")
         self.kpEdit.setFixedWidth(70)
         pidRow.addWidget(self.kpEdit)
 
         pidRow.addWidget(QtWidgets.QLabel("ki:"))
-        self.kiEdit = QtWidgets.QLineEdit("0.1")
+        self.kiEdit = QtWidgets.QLineEdit(f"{FIRMWARE_PID[1]:g}")
         self.kiEdit.setFixedWidth(70)
         pidRow.addWidget(self.kiEdit)
 
         pidRow.addWidget(QtWidgets.QLabel("kd:"))
-        self.kdEdit = QtWidgets.QLineEdit("4.6")
+        self.kdEdit = QtWidgets.QLineEdit(f"{FIRMWARE_PID[2]:g}")
         self.kdEdit.setFixedWidth(70)
         pidRow.addWidget(self.kdEdit)
 
         self.sendPIDBtn = QtWidgets.QPushButton("Enviar PID")
         pidRow.addWidget(self.sendPIDBtn)
+        self.tuneBtn = QtWidgets.QPushButton("Sintonía…")
+        pidRow.addWidget(self.tuneBtn)
         pidRow.addStretch(1)
         top.addLayout(pidRow)
 
@@ -75,14 +499,54 @@ class MainWindow(QtWidgets.QWidget):
 
         self.rb_closed.setChecked(True)
 
+        self.cb_binary = QtWidgets.QCheckBox("Telemetría binaria")
+
+        self.decimCombo = QtWidgets.QComboBox()
+        for label, engine in DECIMATION_ENGINES:
+            self.decimCombo.addItem(label, engine)
+
         modeRow.addWidget(self.rb_closed)
         modeRow.addWidget(self.rb_open)
+        modeRow.addSpacing(15)
+        modeRow.addWidget(self.cb_binary)
+        modeRow.addSpacing(15)
+        modeRow.addWidget(QtWidgets.QLabel("Decimación:"))
+        modeRow.addWidget(self.decimCombo)
         modeRow.addStretch(1)
 
+        self.recordBtn = QtWidgets.QPushButton("Grabar")
+        self.recordBtn.setCheckable(True)
+        self.replayBtn = QtWidgets.QPushButton("Reproducir…")
+        self.stopReplayBtn = QtWidgets.QPushButton("Volver al puerto")
+        self.stopReplayBtn.setEnabled(False)
+        self.speedCombo = QtWidgets.QComboBox()
+        for speed in REPLAY_SPEEDS:
+            self.speedCombo.addItem(f"{speed:g}x" if speed else "máx", speed)
+        modeRow.addWidget(self.recordBtn)
+        modeRow.addWidget(self.replayBtn)
+        modeRow.addWidget(self.stopReplayBtn)
+        modeRow.addWidget(self.speedCombo)
+        modeRow.addSpacing(15)
+
+        self.statsBtn = QtWidgets.QPushButton("Estadísticas")
+        self.statsBtn.setCheckable(True)
+        modeRow.addWidget(self.statsBtn)
+
+        self.liveBtn = QtWidgets.QPushButton("En vivo")
+        self.liveBtn.setEnabled(False)
+        modeRow.addWidget(self.liveBtn)
+
         top.addLayout(modeRow)
 
+        self.deviceCombo.currentIndexChanged.connect(self.onDeviceChanged)
         self.rb_closed.toggled.connect(self.onModeChanged)
         self.rb_open.toggled.connect(self.onModeChanged)
+        self.cb_binary.toggled.connect(self.sendBinary)
+        self.decimCombo.currentIndexChanged.connect(self.onDecimationChanged)
+        self.recordBtn.toggled.connect(self.onRecordToggled)
+        self.replayBtn.clicked.connect(self.onReplay)
+        self.stopReplayBtn.clicked.connect(self.onStopReplay)
+        self.statsBtn.toggled.connect(self.onStatsToggled)
 
         self.errorBox = QtWidgets.QLabel("Error actual: 0.00°")
         self.errorBox.setStyleSheet("""
@@ -95,46 +559,109 @@ class MainWindow(QtWidgets.QWidget):
         """)
         self.errorBox.setFixedWidth(130)
         self.errorBox.setFixedHeight(45)
-        top.addWidget(self.errorBox)
 
-        self.plot = pg.PlotWidget(background="#0e1116")
-        self.plot.setTitle("Ángulo vs Tiempo", color="#e0e0e0")
-        self.plot.setLabel('left', 'Ángulo / Referencia (°)')
-        self.plot.setLabel('bottom', 'Tiempo (s)')
-        self.plot.showGrid(x=True, y=True, alpha=0.2)
-        self.plot.setYRange(-360.0, 360.0)
-
-        self.curve_angle = self.plot.plot([], [], pen=pg.mkPen('#4da3ff', width=2))
-        self.curve_ref   = self.plot.plot([], [], pen=pg.mkPen('#ff5555', width=2, style=QtCore.Qt.DashLine))
+        self.metricsBox = QtWidgets.QLabel()
+        self.metricsBox.setStyleSheet(self.errorBox.styleSheet())
+        self.metricsBox.setFixedHeight(45)
+        self.metricsBox.setMinimumWidth(430)
+        self.bandSpin = QtWidgets.QDoubleSpinBox()
+        self.bandSpin.setRange(0.5, 20.0)
+        self.bandSpin.setSingleStep(0.5)
+        self.bandSpin.setSuffix(" %")
+        self.bandSpin.setValue(SETTLING_BAND * 100.0)
+        self.stepsBtn = QtWidgets.QPushButton("Escalones…")
+        self.stepTable = StepTable(self)
+
+        errorRow = QtWidgets.QHBoxLayout()
+        errorRow.addWidget(self.errorBox)
+        errorRow.addWidget(self.metricsBox)
+        errorRow.addSpacing(15)
+        errorRow.addWidget(QtWidgets.QLabel("Banda:"))
+        errorRow.addWidget(self.bandSpin)
+        errorRow.addWidget(self.stepsBtn)
+        errorRow.addStretch(1)
+        top.addLayout(errorRow)
+
+        self.bandSpin.valueChanged.connect(self.onBandChanged)
+        self.stepsBtn.clicked.connect(self.stepTable.show)
+
+        grid = QtWidgets.QGridLayout()
+        cols = max(1, math.ceil(math.sqrt(len(self.sessions))))
+        self.plots = []
+        for i, s in enumerate(self.sessions):
+            title = "Ángulo vs Tiempo" if len(self.sessions) == 1 else f"Ángulo vs Tiempo — {s.name}"
+            plot = AxisPlot(s, title)
+            grid.addWidget(plot, i // cols, i % cols)
+            self.plots.append(plot)
+        self.plot = self.plots[0]
+        self.liveBtn.clicked.connect(self.onFollowLive)
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.addLayout(top)
-        layout.addWidget(self.plot)
+        layout.addLayout(grid, 1)
 
-        self.t0 = None
-        self.x = deque(maxlen=MAX_POINTS)
-        self.y = deque(maxlen=MAX_POINTS)
-        self.y_ref = deque(maxlen=MAX_POINTS)
-        self._rx_buf = bytearray()
-        self.current_ref = 0.0
+        self.recording = False
+        self._records_detached = 0
+        # eje -> sesión en vivo reemplazada por una reproducción
+        self._live = {}
+        self.stats_file = None
+        self._last_drops = None
+        self.onDeviceChanged(0)
 
         self.sendBtn.clicked.connect(self.onSendRef)
         self.refEdit.returnPressed.connect(self.onSendRef)
 
         self.sendPIDBtn.clicked.connect(self.onSendPID)
+        self.tuning = TuningDialog(self)
+        self.tuneBtn.clicked.connect(self.tuning.show)
         self.kpEdit.returnPressed.connect(self.onSendPID)
         self.kiEdit.returnPressed.connect(self.onSendPID)
         self.kdEdit.returnPressed.connect(self.onSendPID)
 
-        self.readTimer = QtCore.QTimer(self)
-        self.readTimer.timeout.connect(self.readSerialBatch)
-        self.readTimer.start(2)
+        self.ioloop.start()
 
         self.plotTimer = QtCore.QTimer(self)
         self.plotTimer.timeout.connect(self.updatePlot)
         self.plotTimer.start(8)
 
-        self.sendMode(0)
+        self.statsTimer = QtCore.QTimer(self)
+        self.statsTimer.timeout.connect(self.updateStats)
+
+        for s in self.sessions:
+            s.setMode(0)
+
+    @property
+    def current(self):
+        return self.sessions[self.deviceCombo.currentIndex()]
+
+    def onDeviceChanged(self, index: int):
+        s = self.sessions[index]
+        self.refEdit.setText(f"{s.current_ref:g}")
+        self.referencia.setText(f'Referencia: {s.current_ref:g}')
+        kp, ki, kd = s.pid
+        self.kpEdit.setText(f"{kp:g}")
+        self.kiEdit.setText(f"{ki:g}")
+        self.kdEdit.setText(f"{kd:g}")
+        for w, checked in ((self.rb_closed, s.mode == 0), (self.rb_open, s.mode == 1),
+                           (self.cb_binary, s.binary)):
+            w.blockSignals(True)
+            w.setChecked(checked)
+            w.blockSignals(False)
+
+        if s.connected:
+            self.status.setText("Listo")
+            self.status.setStyleSheet("color: #56DB14;")
+        elif s.error is not None:
+            self.status.setText(f"Error en {s.port}: {s.error}")
+            self.status.setStyleSheet("color: #ff6b6b;")
+        else:
+            self.status.setText(f"Sin conexión serial ({s.port})")
+            self.status.setStyleSheet("color: #ff6b6b;")
+        self.angleLabel.setText(f"Angulo Real {fmt(s.last_angle, '{:.2f}')}")
+        self._last_drops = None
+        self._last_error = s.error
+        self.stopReplayBtn.setEnabled(index in self._live)
+        self.showMetrics(s)
 
     def onModeChanged(self, checked: bool):
         if not checked:
@@ -147,164 +674,280 @@ class MainWindow(QtWidgets.QWidget):
 
         self.sendMode(mode)
 
-    def sendMode(self, mode: int):
-        if not self.ser:
-            # self.status.setText("Sin conexión serial")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+    def onDecimationChanged(self, index: int):
+        engine = self.decimCombo.itemData(index)
+        for plot in self.plots:
+            plot.setEngine(engine)
+
+    def onFollowLive(self):
+        for plot in self.plots:
+            plot.followLive()
+        self.liveBtn.setEnabled(False)
+
+    def onRecordToggled(self, checked: bool):
+        if checked:
+            path = os.path.join(SESSIONS_DIR, time.strftime('%Y%m%d-%H%M%S'))
+            for s in self.sessions:
+                s.recorder = SessionRecorder(os.path.join(path, s.name), port=s.port, baud=s.baud,
+                                             mode=s.mode, pid=s.pid)
+                s.recorder.start()
+            self.recording = True
+            self.status.setText(f"Grabando en {path}")
+        elif self.recording:
+            records = self._stopRecording()
+            self.status.setText(f"Sesión guardada ({records} muestras)")
+
+    def _stopRecording(self):
+        records = self._records_detached
+        for s in self.sessions:
+            records += self._closeRecorder(s)
+        self._records_detached = 0
+        self.recording = False
+        return records
+
+    def _closeRecorder(self, s):
+        if not s.recorder:
+            return 0
+        s.recorder.stop()
+        s.recorder.join()
+        records = s.recorder.records
+        s.recorder = None
+        return records
+
+    def onReplay(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, "Sesión a reproducir", SESSIONS_DIR)
+        if not path:
             return
 
-        cmd = f"m={mode}\n"
+        i = self.deviceCombo.currentIndex()
+        old = self.sessions[i]
         try:
-            self.ser.write(cmd.encode('utf-8'))
-            text = "Lazo cerrado" if mode == 0 else "Lazo abierto"
-            pass
-            # self.status.setText(f"TX modo: {text} ({cmd.strip()})")
-            # self.status.setStyleSheet("color: #7ad12b;")
-        except Exception as e:
-            pass
-            # self.status.setText(f"Error TX modo: {e}")
-            # self.status.setStyleSheet("color: #ff6b6b;")
-
-    def readSerialBatch(self):
-        if not self.ser:
+            path = replayPath(path, old.name)
+            replay = ReplaySource(path, self.speedCombo.currentData())
+        except (OSError, ValueError) as e:
+            self.status.setText(f"No se pudo abrir la sesión: {e}")
             return
-        try:
-            n = self.ser.in_waiting
-            if n:
-                chunk = self.ser.read(n)
-                self._rx_buf.extend(chunk)
-                while True:
-                    nl = self._rx_buf.find(b'\n')
-                    if nl < 0:
-                        break
-                    line = self._rx_buf[:nl]
-                    del self._rx_buf[:nl + 1]
-                    self._processLine(line)
-        except Exception as e:
-            pass
-            # self.status.setText(f"Error lectura: {e}")
-            # self.status.setStyleSheet("color: #ff6b6b;")
 
-    def _processLine(self, line: bytes):
+        if isinstance(old, ReplaySource):
+            old.stop()
+            old.join(timeout=1.0)
+        else:
+            self.ioloop.remove(old)
+            self._live[i] = old
+        # el eje reemplazado deja de grabar; sus muestras cuentan al detener
+        self._records_detached += self._closeRecorder(old)
+        replay.stats.enabled = self.statsBtn.isChecked()
+        replay.metrics.band = self.bandSpin.value() / 100.0
+        replay.start()
+        self._setSlot(i, replay)
+        self.status.setText(f"Reproduciendo {path}")
+
+    def onStopReplay(self):
+        i = self.deviceCombo.currentIndex()
+        replay = self.sessions[i]
+        live = self._live.pop(i, None)
+        if live is None or not isinstance(replay, ReplaySource):
+            return
+        replay.stop()
+        replay.join(timeout=1.0)
+        self._records_detached += self._closeRecorder(replay)
+        live.error = None
         try:
-            s = line.decode('utf-8', errors='ignore').strip()
-            if not s:
-                return
-
-            parts = s.split(',')
-            if len(parts) < 2:
-                return
-
-            ang = float(parts[0])
-
-            if len(parts) >= 3:
-                t = float(parts[2])
-            else:
-                t = float(parts[1])
-
-            self.current_error = self.current_ref - ang
-            t_s = t / 1000.0
-            self.status.setText(f'Angulo Real {ang}')
-            self._pushSample(t_s, ang)
-        except ValueError:
-            pass
-
-    def _pushSample(self, t_abs, ang):
-        if self.t0 is None:
-            self.t0 = t_abs
-        t_rel = t_abs - self.t0
-
-        self.x.append(t_rel)
-        self.y.append(ang)
-        self.y_ref.append(self.current_ref)
-
-        xmin = t_rel - WINDOW_SECONDS
-        while self.x and self.x[0] < xmin:
-            self.x.popleft()
-            self.y.popleft()
-            self.y_ref.popleft()
-
-    def updatePlot(self):
-        if not self.x:
+            live.open()
+            self.ioloop.add(live)
+        except serial.SerialException as e:
+            live.error = e
+        self._setSlot(i, live)
+
+    def _setSlot(self, i, s):
+        self.sessions[i] = s
+        self.plots[i].setSession(s)
+        self.deviceCombo.setItemText(i, s.name)
+        self.onDeviceChanged(i)
+
+    def onBandChanged(self, value: float):
+        for s in self.sessions:
+            s.metrics.band = value / 100.0
+
+    def showMetrics(self, s):
+        m = s.metrics.current
+        if m is None:
+            self.metricsBox.setText("Sin escalón de referencia")
             return
+        self.metricsBox.setText(
+            f"Subida {fmt(m['rise'], '{:.3f}')} s   Sobrepaso {m['overshoot']:.1f} %   "
+            f"Establec. {fmt(m['settling'], '{:.3f}')} s\n"
+            f"e_ss {fmt(m['ess'], '{:.2f}')}°   IAE {m['iae']:.2f}   ISE {m['ise']:.1f}   ITAE {m['itae']:.2f}")
+
+    def onStatsToggled(self, checked: bool):
+        for s, plot in zip(self.sessions, self.plots):
+            s.stats.reset()
+            s.stats.enabled = checked
+            plot.overlay.setVisible(checked)
+
+        if checked:
+            os.makedirs(SESSIONS_DIR, exist_ok=True)
+            path = os.path.join(SESSIONS_DIR, f"estadisticas-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+            self.stats_file = open(path, 'w', encoding='utf-8')
+            self.statsTimer.start(STATS_REFRESH_MS)
+            self.status.setText(f"Estadísticas en {path}")
+        else:
+            self.statsTimer.stop()
+            self._closeStats()
+
+    def updateStats(self):
+        for s, plot in zip(self.sessions, self.plots):
+            counters = s.counters()
+            snap = s.stats.snapshot(device=s.name, **counters)
+            plot.showStats(s.stats.summary(snap, counters))
+            if self.stats_file:
+                s.stats.dump(self.stats_file, snap)
+        if self.stats_file:
+            self.stats_file.flush()
+
+    def _closeStats(self):
+        if self.stats_file:
+            self.stats_file.close()
+            self.stats_file = None
+
+    def setStatus(self, text, error=False):
+        self.status.setText(text)
+        self.status.setStyleSheet("color: #ff6b6b;" if error else "color: #7ad12b;")
+
+    def txFailed(self, s):
+        if s.connected and s.loop is not None:
+            self.setStatus(f"Cola de comandos llena ({s.dropped_commands} descartados)", error=True)
+        elif s.error is not None:
+            self.setStatus(f"Sin conexión serial ({s.port}): {s.error}", error=True)
+        else:
+            self.setStatus(f"Sin conexión serial ({s.port})", error=True)
 
-        step = max(1, len(self.x) // DOWNSAMPLE_TARGET)
-
-        xs = list(self.x)[::step]
-        ys = list(self.y)[::step]
-        yrefs = list(self.y_ref)[::step]
+    def sendMode(self, mode: int):
+        s = self.current
+        if not s.setMode(mode):
+            self.txFailed(s)
+            return
+        text = "Lazo cerrado" if mode == 0 else "Lazo abierto"
+        self.setStatus(f"TX modo: {text} (m={mode})")
 
-        self.curve_angle.setData(xs, ys)
-        self.curve_ref.setData(xs, yrefs)
-        self.plot.setXRange(self.x[0], self.x[-1], padding=0)
+    def sendBinary(self, enabled: bool):
+        s = self.current
+        if not s.setBinary(enabled):
+            self.txFailed(s)
+            self.cb_binary.blockSignals(True)
+            self.cb_binary.setChecked(s.binary)
+            self.cb_binary.blockSignals(False)
 
-        self.errorBox.setText(f"Error actual: {self.current_error:.2f}°")
+    def updatePlot(self):
+        # un solo tick para todos los ejes; solo se redibuja lo que cambió
+        current = self.current
+        fresh = 0
+        for s, plot in zip(self.sessions, self.plots):
+            n = s.pump()
+            if s.stats.enabled and s.stats.due('render'):
+                c0 = time.perf_counter()
+                if plot.render(n):
+                    s.stats.stages['render'].add(time.perf_counter() - c0)
+            else:
+                plot.render(n)
+            if s is current:
+                fresh = n
+        self.liveBtn.setEnabled(not all(p.following for p in self.plots))
+
+        s = current
+        if fresh:
+            self.showMetrics(s)
+            self.angleLabel.setText(f"Angulo Real {s.last_angle:.2f}")
+
+        if s.error is not self._last_error:
+            self._last_error = s.error
+            if s.error is not None:
+                self.status.setText(f"Error en {s.port}: {s.error}")
+                self.status.setStyleSheet("color: #ff6b6b;")
+
+        if s.binary_fallback:
+            s.binary_fallback = False
+            self.cb_binary.blockSignals(True)
+            self.cb_binary.setChecked(False)
+            self.cb_binary.blockSignals(False)
+            self.status.setText("Sin tramas binarias, se usa ASCII")
+
+        drops = (s.dropped_batches, s.malformed, s.tx_errors)
+        if drops != self._last_drops:
+            self._last_drops = drops
+            self.dropLabel.setText(f"Lotes descartados: {drops[0]}  Líneas inválidas: {drops[1]}  "
+                                   f"Errores TX: {drops[2]}")
+            self.dropLabel.setVisible(any(drops))
+
+        self.errorBox.setText(f"Error actual: {s.current_error:.2f}°")
 
     def onSendRef(self):
         txt = self.refEdit.text().strip()
+        s = self.current
         try:
-            ref = float(txt)
+            sent = s.setReference(txt)
             self.referencia.setText(f'Referencia: {txt}')
         except ValueError:
-            # self.status.setText("Referencia inválida")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+            self.setStatus(f"Referencia inválida: {txt!r}", error=True)
             return
 
-        self.current_ref = ref
-
-        if not self.ser:
-#            self.status.setText("Sin conexión serial")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+        if not sent:
+            self.txFailed(s)
             return
-
-        try:
-            self.ser.write((txt + "\n").encode('utf-8'))
-            # self.status.setText(f"TX ref: {txt}")
-#            self.status.setStyleSheet("color: #7ad12b;")
-        except Exception as e:
-            pass
-            # self.status.setText(f"Error TX ref: {e}")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+        self.setStatus(f"TX ref: {txt}")
 
     def onSendPID(self):
         kp_txt = self.kpEdit.text().strip()
         ki_txt = self.kiEdit.text().strip()
         kd_txt = self.kdEdit.text().strip()
 
+        s = self.current
         try:
-            float(kp_txt); float(ki_txt); float(kd_txt)
+            sent = s.setPID(kp_txt, ki_txt, kd_txt)
         except ValueError:
-            # self.status.setText("kp/ki/kd inválidos")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+            self.setStatus("kp/ki/kd inválidos", error=True)
             return
 
-        if not self.ser:
-            # self.status.setText("Sin conexión serial")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+        if not sent:
+            self.txFailed(s)
             return
-
-        cmd = f"kd={kd_txt},ki={ki_txt},kp={kp_txt}\n"
-        try:
-            self.ser.write(cmd.encode('utf-8'))
-            # self.status.setText(f"TX PID: {cmd.strip()}")
-            # self.status.setStyleSheet("color: #7ad12b;")
-        except Exception as e:
-            pass
-            # self.status.setText(f"Error TX PID: {e}")
-            # self.status.setStyleSheet("color: #ff6b6b;")
+        self.setStatus(f"TX PID: kd={kd_txt},ki={ki_txt},kp={kp_txt}")
 
     def closeEvent(self, event):
-        try:
-            if self.ser and self.ser.is_open:
-                self.ser.close()
-        except:
-            pass
+        self.tuning.shutdown()
+        self.ioloop.stop()
+        self.ioloop.join(timeout=1.0)
+        for s in self.sessions:
+            if isinstance(s, ReplaySource):
+                s.stop()
+                s.join(timeout=1.0)
+        if self.recording:
+            self._stopRecording()
+        self._closeStats()
         event.accept()
 
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
+    ap = argparse.ArgumentParser(description="Control de posición")
+    ap.add_argument('--port', action='append',
+                    help="puerto serie; repetir para monitorear varios ejes")
+    ap.add_argument('--baud', type=int, default=BAUD)
+    ap.add_argument('--simulate', type=float, metavar='RATE',
+                    help="usar el simulador en un pty a RATE muestras/s en vez del puerto")
+    ap.add_argument('--axes', type=int, default=1, help="cantidad de ejes simulados")
+    args, qt_args = ap.parse_known_args()
+
+    ports = args.port or [os.environ.get('CONTROL_PORT', PORT)]
+    if args.simulate:
+        from simulator import Simulator
+        ports = []
+        for _ in range(args.axes):
+            sim = Simulator(args.simulate)
+            ports.append(sim.open())
+            sim.start()
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
     pg.setConfigOptions(antialias=False, useOpenGL=False)
-    win = MainWindow()
+    win = MainWindow(ports, args.baud)
     win.show()
     sys.exit(app.exec())
@@ -0,0 +1,209 @@
+"""Pirámide min/máx del historial completo para hacer zoom sobre corridas largas.
+
+El nivel 0 son las muestras crudas (t, y, y_ref). Cada nivel siguiente
+agrupa FACTOR entradas del anterior y guarda el tiempo inicial del grupo y
+el mínimo/máximo de ángulo y referencia. Los niveles se completan a medida
+que llegan lotes, así una consulta solo recorta el nivel adecuado.
+
+Las columnas viven en bloques fijos (CHUNK entradas las crudas, LEVEL_CHUNK
+los niveles), así que crecer no copia nada. De las muestras crudas solo se
+guardan las últimas ~RAW_MAX; un zoom sobre tramos más viejos se sirve con
+el primer nivel reducido.
+"""
+import bisect
+
+import numpy as np
+
+FACTOR = 8
+CHUNK = 1 << 16
+LEVEL_CHUNK = 1 << 12
+RAW_MAX = 1 << 20
+
+
+class _Columns:
+    """Columnas float64 por bloques; los índices son absolutos desde el inicio."""
+
+    def __init__(self, names, chunk=CHUNK):
+        self.names = names
+        self.chunk = chunk
+        self.n = 0
+        self.base = 0
+        self.chunks = []
+        self.starts = []
+
+    def extend(self, **values):
+        k = values['t'].shape[0]
+        i = 0
+        while i < k:
+            off = self.n % self.chunk
+            if off == 0:
+                self.chunks.append({name: np.empty(self.chunk, dtype=np.float64) for name in self.names})
+                self.starts.append(float(values['t'][i]))
+            m = min(self.chunk - off, k - i)
+            chunk = self.chunks[-1]
+            for name, v in values.items():
+                chunk[name][off:off + m] = v[i:i + m]
+            i += m
+            self.n += m
+
+    def get(self, name, i0, i1):
+        i0 = max(i0, self.base)
+        i1 = min(i1, self.n)
+        if i1 <= i0:
+            return np.empty(0)
+        c0, o0 = divmod(i0 - self.base, self.chunk)
+        c1, o1 = divmod(i1 - 1 - self.base, self.chunk)
+        if c0 == c1:
+            return self.chunks[c0][name][o0:o1 + 1]
+        parts = [self.chunks[c0][name][o0:]]
+        parts += [self.chunks[c][name] for c in range(c0 + 1, c1)]
+        parts.append(self.chunks[c1][name][:o1 + 1])
+        return np.concatenate(parts)
+
+    def search(self, t, side='left'):
+        """Como np.searchsorted sobre la columna 't' guardada (índice absoluto)."""
+        if side == 'left':
+            c = bisect.bisect_left(self.starts, t) - 1
+        else:
+            c = bisect.bisect_right(self.starts, t) - 1
+        if c < 0:
+            return self.base
+        start = self.base + c * self.chunk
+        col = self.chunks[c]['t'][:min(self.chunk, self.n - start)]
+        return start + int(np.searchsorted(col, t, side=side))
+
+    def first(self, name):
+        return self.chunks[0][name][0]
+
+    def dropBefore(self, i):
+        # solo bloques enteros; el último queda siempre
+        while len(self.chunks) > 1 and self.base + self.chunk <= i:
+            del self.chunks[0]
+            del self.starts[0]
+            self.base += self.chunk
+
+
+class MinMaxPyramid:
+
+    def __init__(self, factor=FACTOR, raw_max=RAW_MAX):
+        self.factor = factor
+        self.raw_max = raw_max
+        self.raw = _Columns(('t', 'y', 'r'))
+        self.levels = []
+
+    def __len__(self):
+        return self.raw.n
+
+    def extend(self, t, y, ref):
+        t = np.asarray(t, dtype=np.float64)
+        n = t.shape[0]
+        if n == 0:
+            return
+        self.raw.extend(t=t, y=np.broadcast_to(y, (n,)), r=np.broadcast_to(ref, (n,)))
+        self._reduce()
+        if self.levels and self.raw.n - self.raw.base > self.raw_max + self.raw.chunk:
+            # lo que se descarta ya está resumido en el nivel 1
+            self.raw.dropBefore(min(self.raw.n - self.raw_max, self.levels[0].n * self.factor))
+
+    def _reduce(self):
+        f = self.factor
+        src = self.raw
+        lvl = 0
+        while True:
+            if lvl == len(self.levels):
+                if src.n < f:
+                    return
+                self.levels.append(_Columns(('t', 'ymin', 'ymax', 'rmin', 'rmax'), LEVEL_CHUNK))
+            dst = self.levels[lvl]
+            done = dst.n * f
+            groups = (src.n - done) // f
+            if groups == 0:
+                return
+            end = done + groups * f
+            if src is self.raw:
+                ymin = ymax = src.get('y', done, end).reshape(groups, f)
+                rmin = rmax = src.get('r', done, end).reshape(groups, f)
+            else:
+                ymin = src.get('ymin', done, end).reshape(groups, f)
+                ymax = src.get('ymax', done, end).reshape(groups, f)
+                rmin = src.get('rmin', done, end).reshape(groups, f)
+                rmax = src.get('rmax', done, end).reshape(groups, f)
+            dst.extend(
+                t=src.get('t', done, end)[::f],
+                ymin=ymin.min(axis=1), ymax=ymax.max(axis=1),
+                rmin=rmin.min(axis=1), rmax=rmax.max(axis=1),
+            )
+            src = dst
+            lvl += 1
+
+    def _tail(self, lvl, t1):
+        # lo que todavía no completa un grupo de `lvl` hasta t1: (t, ymin, ymax, rmin, rmax)
+        f = self.factor
+        parts = []
+        for k in range(lvl, 0, -1):
+            src = self.levels[k - 1]
+            lo = self.levels[k].n * f
+            hi = min(src.n, src.search(t1, 'right'))
+            if hi > lo:
+                parts.append((src.get('t', lo, lo + 1)[0],
+                              src.get('ymin', lo, hi).min(), src.get('ymax', lo, hi).max(),
+                              src.get('rmin', lo, hi).min(), src.get('rmax', lo, hi).max()))
+        lo = self.levels[0].n * f
+        hi = min(self.raw.n, self.raw.search(t1, 'right'))
+        if hi > lo:
+            y, r = self.raw.get('y', lo, hi), self.raw.get('r', lo, hi)
+            parts.append((self.raw.get('t', lo, lo + 1)[0], y.min(), y.max(), r.min(), r.max()))
+        if not parts:
+            return None
+        return (parts[0][0], min(p[1] for p in parts), max(p[2] for p in parts),
+                min(p[3] for p in parts), max(p[4] for p in parts))
+
+    def query(self, t0, t1, n_px):
+        """Devuelve (x, y, y_ref) para [t0, t1] con a lo sumo ~2 * n_px puntos.
+
+        Usa el nivel más fino cuya cantidad de entradas en el rango cabe en
+        n_px; en niveles reducidos cada entrada aporta su par min/máx.
+        """
+        n_px = max(1, int(n_px))
+        raw = self.raw
+        if not raw.n:
+            return np.empty(0), np.empty(0), np.empty(0)
+        if not self.levels or t0 >= raw.first('t'):
+            i0 = max(raw.base, raw.search(t0, 'left') - 1)
+            i1 = min(raw.n, raw.search(t1, 'right') + 1)
+            if i1 - i0 <= 2 * n_px or not self.levels:
+                return raw.get('t', i0, i1), raw.get('y', i0, i1), raw.get('r', i0, i1)
+            count = i1 - i0
+        else:
+            # el tramo empieza antes de las muestras crudas guardadas
+            first = self.levels[0]
+            count = (first.search(t1, 'right') - first.search(t0, 'left') + 1) * self.factor
+
+        lvl = 0
+        while lvl < len(self.levels) - 1 and count // self.factor ** (lvl + 1) > n_px:
+            lvl += 1
+        level = self.levels[lvl]
+        j0 = max(0, level.search(t0, 'right') - 1)
+        j1 = min(level.n, level.search(t1, 'right') + 1)
+
+        bt = level.get('t', j0, j1)
+        ymin, ymax = level.get('ymin', j0, j1), level.get('ymax', j0, j1)
+        rmin, rmax = level.get('rmin', j0, j1), level.get('rmax', j0, j1)
+
+        # muestras que todavía no completan un grupo de este nivel
+        tail = self._tail(lvl, t1) if j1 == level.n else None
+        if tail is not None:
+            bt = np.append(bt, tail[0])
+            ymin = np.append(ymin, tail[1])
+            ymax = np.append(ymax, tail[2])
+            rmin = np.append(rmin, tail[3])
+            rmax = np.append(rmax, tail[4])
+
+        x = np.repeat(bt, 2)
+        y = np.empty(x.shape[0])
+        y[0::2] = ymin
+        y[1::2] = ymax
+        r = np.empty(x.shape[0])
+        r[0::2] = rmin
+        r[1::2] = rmax
+        return x, y, r
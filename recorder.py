@@ -0,0 +1,228 @@
+"""Grabación de sesiones en disco y reproducción a través del mismo camino de parseo.
+
+Una sesión es un directorio con:
+    meta.json     versión del formato y datos de la sesión
+    samples.bin   registros SAMPLE_DTYPE (t, ang, ref) escritos por lotes
+    index.bin     float64: t del registro 0, INDEX_STRIDE, 2*INDEX_STRIDE, ...
+    commands.log  "t<TAB>comando" por cada comando enviado
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from firmware import FIRMWARE_PID
+from session import DeviceSession, deviceName
+
+FORMAT_VERSION = 1
+SAMPLE_DTYPE = np.dtype([('t', '<f8'), ('ang', '<f8'), ('ref', '<f8')])
+INDEX_STRIDE = 65536
+FLUSH_SECONDS = 0.25
+REPLAY_CHUNK = 4096
+REPLAY_SPEEDS = (1.0, 10.0, 0.0)
+
+
+class SessionRecorder(threading.Thread):
+    """Escribe muestras y comandos en un hilo aparte, en bloques."""
+
+    def __init__(self, path, **meta):
+        super().__init__(daemon=True)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'created': time.time(),
+                       'index_stride': INDEX_STRIDE, **meta}, f)
+
+        self.records = 0
+        self.write_errors = 0
+        self._queue = queue.Queue()
+        self._stop_evt = threading.Event()
+
+    def addSamples(self, t, ang, ref):
+        rec = np.empty(t.shape[0], dtype=SAMPLE_DTYPE)
+        rec['t'] = t
+        rec['ang'] = ang
+        rec['ref'] = ref
+        self._queue.put(rec)
+
+    def addCommand(self, t, text: str):
+        self._queue.put((float(t), text.strip()))
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def run(self):
+        samples = open(os.path.join(self.path, 'samples.bin'), 'ab')
+        index = open(os.path.join(self.path, 'index.bin'), 'ab')
+        commands = open(os.path.join(self.path, 'commands.log'), 'a', encoding='utf-8')
+        try:
+            while True:
+                stopping = self._stop_evt.wait(FLUSH_SECONDS)
+                self._flush(samples, index, commands)
+                if stopping:
+                    break
+        finally:
+            samples.close()
+            index.close()
+            commands.close()
+
+    def _flush(self, samples, index, commands):
+        recs = []
+        cmds = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                cmds.append(item)
+            else:
+                recs.append(item)
+
+        try:
+            if recs:
+                block = np.concatenate(recs)
+                first = self.records
+                marks = np.arange(-(-first // INDEX_STRIDE) * INDEX_STRIDE,
+                                  first + block.shape[0], INDEX_STRIDE)
+                block.tofile(samples)
+                block['t'][marks - first].astype('<f8').tofile(index)
+                self.records += block.shape[0]
+                samples.flush()
+                index.flush()
+            if cmds:
+                commands.writelines(f"{t!r}\t{text}\n" for t, text in cmds)
+                commands.flush()
+        except OSError:
+            self.write_errors += 1
+
+
+class SessionLog:
+    """Lectura de una sesión grabada; las muestras se abren con numpy.memmap."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.stride = self.meta.get('index_stride', INDEX_STRIDE)
+
+        sample_path = os.path.join(path, 'samples.bin')
+        n = os.path.getsize(sample_path) // SAMPLE_DTYPE.itemsize
+        if n:
+            self.samples = np.memmap(sample_path, dtype=SAMPLE_DTYPE, mode='r', shape=(n,))
+        else:
+            self.samples = np.empty(0, dtype=SAMPLE_DTYPE)
+        index_path = os.path.join(path, 'index.bin')
+        self.index = np.fromfile(index_path, dtype='<f8') if os.path.exists(index_path) else np.empty(0)
+
+        self.commands = []
+        cmd_path = os.path.join(path, 'commands.log')
+        if os.path.exists(cmd_path):
+            with open(cmd_path, encoding='utf-8') as f:
+                for line in f:
+                    t, _, text = line.rstrip('\n').partition('\t')
+                    self.commands.append((float(t), text))
+
+    def __len__(self):
+        return self.samples.shape[0]
+
+    def locate(self, t):
+        """Índice del primer registro con tiempo >= t (usa el índice y luego el bloque)."""
+        if not self.index.shape[0]:
+            return int(np.searchsorted(self.samples['t'], t, side='left'))
+        k = int(np.searchsorted(self.index, t, side='right')) - 1
+        lo = max(0, k) * self.stride
+        hi = min(len(self), lo + self.stride)
+        return lo + int(np.searchsorted(self.samples['t'][lo:hi], t, side='left'))
+
+    def between(self, t0, t1):
+        return self.samples[self.locate(t0):self.locate(t1)]
+
+
+class ReplaySource(DeviceSession):
+    """Reproduce una sesión como si llegara por el puerto serie.
+
+    Las muestras se vuelven a escribir como líneas ASCII y pasan por el
+    mismo `LineParser`; speed=0 reproduce lo más rápido posible. Tiene su
+    propio hilo y no pasa por el IOLoop; los comandos se ignoran.
+    """
+
+    def __init__(self, path, speed=1.0, name=None):
+        self.log = SessionLog(path)
+        super().__init__(path, 0, name=name or 'replay_' + deviceName(path))
+        # estado del eje al empezar la grabación, para las métricas del escalón
+        self.mode = int(self.log.meta.get('mode') or 0)
+        self.pid = tuple(self.log.meta.get('pid') or FIRMWARE_PID)
+        self.speed = speed
+        self.finished = False
+        self._stop_evt = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def open(self):
+        pass
+
+    def send(self, text: str, binary=None) -> bool:
+        return False
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        rec = self.log.samples
+        n = len(self.log)
+        if not n:
+            self.finished = True
+            return
+        t_start = rec['t'][0]
+        wall0 = time.perf_counter()
+        for i in range(0, n, REPLAY_CHUNK):
+            if self._stop_evt.is_set():
+                return
+            block = np.asarray(rec[i:i + REPLAY_CHUNK])
+            if self.speed > 0:
+                # se liberan las muestras a medida que "ocurren" en la sesión
+                for j in self._paced(block, t_start, wall0):
+                    if self._stop_evt.is_set():
+                        return
+                    self._feedBlock(j)
+            else:
+                self._feedBlock(block)
+        self.finished = True
+
+    def _paced(self, block, t_start, wall0):
+        i = 0
+        while i < block.shape[0]:
+            due = t_start + (time.perf_counter() - wall0) * self.speed
+            j = int(np.searchsorted(block['t'], due, side='right'))
+            if j > i:
+                yield block[i:j]
+                i = j
+            else:
+                wait = (block['t'][i] - due) / self.speed
+                self._stop_evt.wait(min(wait, 0.05))
+
+    def _publish(self, batch):
+        # a diferencia del puerto, aquí se puede esperar a la GUI sin perder datos
+        while not self._stop_evt.is_set():
+            try:
+                self.batches.put(batch, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def _feedBlock(self, block):
+        text = ''.join(f"{a:.6f},0,{t * 1000.0:.6f}\n"
+                       for a, t in zip(block['ang'].tolist(), block['t'].tolist()))
+        t, ang = self.parser.feed(text.encode('utf-8'))
+        if t.shape[0]:
+            ref = block['ref'] if t.shape[0] == block.shape[0] else None
+            self._publish((t, ang, ref))
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class SampleRing:
+    """Historial columnar (t, y, y_ref) en float64 con ventana deslizante.
+
+    Los datos vivos siempre ocupan un tramo contiguo de cada columna, así
+    `view()` devuelve vistas sin copia. Cuando el tramo llega al final del
+    arreglo (de tamaño 2 * capacity) se compacta al inicio, lo que deja el
+    costo amortizado de `extend` en O(n) por lote.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._t = np.empty(2 * self.capacity, dtype=np.float64)
+        self._y = np.empty(2 * self.capacity, dtype=np.float64)
+        self._r = np.empty(2 * self.capacity, dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self.appended = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def extend(self, t, y, ref):
+        t = np.asarray(t, dtype=np.float64)
+        n = t.shape[0]
+        if n == 0:
+            return
+        y = np.broadcast_to(np.asarray(y, dtype=np.float64), (n,))
+        ref = np.broadcast_to(np.asarray(ref, dtype=np.float64), (n,))
+
+        if n > self.capacity:
+            self.evicted += len(self) + n - self.capacity
+            t, y, ref = t[-self.capacity:], y[-self.capacity:], ref[-self.capacity:]
+            self.appended += n - self.capacity
+            n = self.capacity
+            self._start = self._end = 0
+
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self._start += overflow
+            self.evicted += overflow
+
+        if self._end + n > self._t.shape[0]:
+            live = len(self)
+            for col in (self._t, self._y, self._r):
+                col[:live] = col[self._start:self._end]
+            self._start, self._end = 0, live
+
+        s = slice(self._end, self._end + n)
+        self._t[s] = t
+        self._y[s] = y
+        self._r[s] = ref
+        self._end += n
+        self.appended += n
+
+    def trimBefore(self, tmin):
+        t = self._t[self._start:self._end]
+        k = int(np.searchsorted(t, tmin, side='left'))
+        self._start += k
+        self.evicted += k
+
+    def view(self):
+        s = slice(self._start, self._end)
+        return self._t[s], self._y[s], self._r[s]
+
+    def startIndex(self):
+        # índice absoluto (desde que se creó el buffer) de view()[0]
+        return self.appended - len(self)
+
+    def lastTime(self):
+        return self._t[self._end - 1]
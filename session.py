@@ -0,0 +1,413 @@
+"""Sesión de dispositivo (un eje) y el lazo de E/S que atiende a todas.
+
+`DeviceSession` reúne lo que antes vivía en MainWindow: puerto, parser,
+buffers, canal de comandos y el estado del eje (referencia, PID, modo).
+No depende de Qt. Un solo `IOLoop` lee y escribe todos los puertos con un
+selector; la GUI solo llama a `pump()` en su tick de dibujo.
+"""
+import os
+import queue
+import re
+import selectors
+import socket
+import threading
+import time
+
+import serial
+
+from binproto import FrameDecoder
+from firmware import FIRMWARE_PID
+from pyramid import MinMaxPyramid
+from ringbuffer import SampleRing
+from stats import PipelineStats
+from stepmetrics import StepTracker
+from telemetry import LineParser
+
+READ_TIMEOUT = 0.02
+RX_QUEUE_BATCHES = 256
+TX_QUEUE_CMDS = 64
+BINARY_FALLBACK_SECONDS = 1.0
+MAX_POINTS = 200000
+WINDOW_SECONDS = 5.0
+
+
+def deviceName(port: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', os.path.basename(port.rstrip('/\\'))) or 'dev'
+
+
+class DeviceSession:
+    """Un controlador conectado por un puerto serie.
+
+    Lado E/S (lo llama el IOLoop): `readAvailable`, `flushCommands`.
+    Lado GUI: `send*`, `set*` y `pump`, que pasa los lotes (t_s, ang, ref)
+    ya parseados a `history` (ventana), `pyramid` (corrida completa) y
+    `metrics` (respuesta al escalón).
+    """
+
+    def __init__(self, port, baud, name=None, capacity=MAX_POINTS, window=WINDOW_SECONDS):
+        self.port = port
+        self.baud = baud
+        self.name = name or deviceName(port)
+        self.ser = None
+        self.error = None
+        self.loop = None
+
+        self.batches = queue.Queue(maxsize=RX_QUEUE_BATCHES)
+        self.commands = queue.Queue(maxsize=TX_QUEUE_CMDS)
+        self.dropped_batches = 0
+        self.dropped_commands = 0
+        self.tx_errors = 0
+
+        self.parser = LineParser()
+        self.binary = False
+        # lo pide flushCommands; el cambio de parser lo hace el hilo que lee
+        self._want_binary = False
+        self.binary_fallback = False
+        self._binary_since = 0.0
+        self._malformed_base = 0
+        self._lines_base = 0
+        self.stats = PipelineStats()
+
+        self.window = window
+        self.history = SampleRing(capacity)
+        self.pyramid = MinMaxPyramid()
+        self.metrics = StepTracker()
+        self.recorder = None
+
+        self.t0 = None
+        self.mode = 0
+        self.current_ref = 0.0
+        self.current_error = 0.0
+        self.last_angle = None
+        self.pid = FIRMWARE_PID
+
+    @property
+    def connected(self):
+        return self.ser is not None
+
+    @property
+    def malformed(self):
+        return self._malformed_base + self.parser.malformed
+
+    @property
+    def lines(self):
+        return self._lines_base + self._parsedLines()
+
+    def _parsedLines(self):
+        # la GUI lo lee mientras el hilo lector puede estar cambiando de parser
+        parser = self.parser
+        return parser.frames if isinstance(parser, FrameDecoder) else parser.lines
+
+    def counters(self) -> dict:
+        out = {
+            'lines': self.lines,
+            'malformed': self.malformed,
+            'evicted': self.history.evicted,
+            'dropped_batches': self.dropped_batches,
+            'dropped_commands': self.dropped_commands,
+            'tx_errors': self.tx_errors,
+        }
+        if self.error is not None:
+            out['error'] = str(self.error)
+        return out
+
+    def open(self):
+        self.ser = serial.Serial(self.port, self.baud, timeout=0)
+
+    def close(self):
+        ser, self.ser = self.ser, None
+        try:
+            if ser and ser.is_open:
+                ser.close()
+        except Exception:
+            pass
+
+    # --- lado E/S -----------------------------------------------------
+
+    def readAvailable(self):
+        st = self.stats
+        t_recv = None
+        if st.enabled and st.due('read'):
+            c0 = time.perf_counter()
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+            t_recv = time.perf_counter()
+            st.stages['read'].add(t_recv - c0)
+        else:
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+        if chunk:
+            if st.enabled:
+                st.bytes += len(chunk)
+            if self._want_binary != self.binary:
+                self._setDecoder(self._want_binary)
+            self.feed(chunk, t_recv)
+
+    def feed(self, chunk, t_recv=None):
+        # con t_recv (lectura muestreada por readAvailable) se mide el parseo
+        t, ang = self.parser.feed(chunk)
+        if t_recv is not None:
+            st = self.stats
+            st.stages['parse'].add(time.perf_counter() - t_recv)
+            if t.shape[0]:
+                # se guarda crudo; el mínimo se descuenta en PipelineStats.flush
+                st.stages['gap'].add(t_recv - t.item(-1))
+        if t.shape[0]:
+            self._publish((t, ang, None))
+        elif self.binary and not self.parser.frames \
+                and time.monotonic() - self._binary_since > BINARY_FALLBACK_SECONDS:
+            # el firmware no respondió con tramas: se sigue en ASCII
+            self._want_binary = False
+            self._setDecoder(False)
+            self.binary_fallback = True
+
+    def flushCommands(self):
+        while True:
+            try:
+                data, binary = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.ser.write(data)
+            except Exception:
+                self.tx_errors += 1
+                continue
+            if binary is not None:
+                self._want_binary = binary
+
+    def _setDecoder(self, binary: bool):
+        self._malformed_base += self.parser.malformed
+        self._lines_base += self._parsedLines()
+        self.parser = FrameDecoder() if binary else LineParser()
+        self.binary = binary
+        self._binary_since = time.monotonic()
+
+    def _publish(self, batch):
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            # la GUI no da abasto: se descarta el lote más viejo
+            try:
+                self.batches.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped_batches += 1
+            try:
+                self.batches.put_nowait(batch)
+            except queue.Full:
+                self.dropped_batches += 1
+
+    # --- lado GUI -----------------------------------------------------
+
+    def send(self, text: str, binary=None) -> bool:
+        # sin IOLoop nadie escribiría el comando
+        if not self.connected or self.loop is None:
+            return False
+        try:
+            self.commands.put_nowait((text.encode('utf-8'), binary))
+        except queue.Full:
+            self.dropped_commands += 1
+            return False
+        if self.loop:
+            self.loop.wake()
+        return True
+
+    def setBinary(self, enabled: bool) -> bool:
+        return self.send(f"b={1 if enabled else 0}\n", binary=enabled)
+
+    def setMode(self, mode: int) -> bool:
+        self.mode = mode
+        cmd = f"m={mode}\n"
+        self._logCommand(cmd)
+        return self.send(cmd)
+
+    def setReference(self, txt: str) -> bool:
+        self.current_ref = float(txt)
+        self._logCommand(txt)
+        return self.send(txt + "\n")
+
+    def setPID(self, kp_txt: str, ki_txt: str, kd_txt: str) -> bool:
+        self.pid = (float(kp_txt), float(ki_txt), float(kd_txt))
+        cmd = f"kd={kd_txt},ki={ki_txt},kp={kp_txt}\n"
+        self._logCommand(cmd)
+        return self.send(cmd)
+
+    def drain(self):
+        out = []
+        while True:
+            try:
+                out.append(self.batches.get_nowait())
+            except queue.Empty:
+                return out
+
+    def pump(self) -> int:
+        st = self.stats
+        timed = st.enabled and st.due('push')
+        n = 0
+        batches = self.drain()
+        c0 = time.perf_counter() if timed else 0.0
+        for t_s, angs, refs in batches:
+            self._pushBatch(t_s, angs, refs)
+            if timed:
+                c1 = time.perf_counter()
+                st.stages['push'].add(c1 - c0)
+                c0 = c1
+            if refs is not None:
+                self.current_ref = refs[-1]
+            self.last_angle = angs[-1]
+            n += t_s.shape[0]
+        if st.enabled:
+            st.batches += len(batches)
+            st.samples += n
+        if n:
+            self.current_error = self.current_ref - self.last_angle
+        return n
+
+    def _pushBatch(self, t_abs, ang, ref=None):
+        if self.t0 is None:
+            self.t0 = t_abs[0]
+        t_rel = t_abs - self.t0
+        if ref is None:
+            ref = self.current_ref
+
+        self.history.extend(t_rel, ang, ref)
+        self.history.trimBefore(t_rel[-1] - self.window)
+        self.pyramid.extend(t_rel, ang, ref)
+        self.metrics.update(t_rel, ang, ref, self.pid, self.mode)
+        if self.recorder:
+            self.recorder.addSamples(t_rel, ang, ref)
+
+    def _logCommand(self, cmd: str):
+        if self.recorder:
+            t = self.history.lastTime() if len(self.history) else 0.0
+            self.recorder.addCommand(t, cmd)
+
+
+class IOLoop(threading.Thread):
+    """Un hilo para todos los puertos.
+
+    Donde el puerto expone `fileno()` (POSIX) se espera con un selector;
+    los que no (Windows) tienen su propio hilo lector con una lectura
+    bloqueante de hasta READ_TIMEOUT que alimenta la misma sesión. Un
+    socketpair despierta al lazo cuando la GUI encola un comando.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.sessions = []
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._readers = {}
+        self._pending = queue.Queue()
+        self._stop_evt = threading.Event()
+
+    def add(self, session: DeviceSession):
+        session.loop = self
+        self._pending.put((True, session))
+        self.wake()
+
+    def remove(self, session: DeviceSession):
+        self._pending.put((False, session))
+        self.wake()
+
+    def wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def stop(self):
+        self._stop_evt.set()
+        self.wake()
+
+    def run(self):
+        try:
+            while not self._stop_evt.is_set():
+                self._applyPending()
+                for s in self.sessions:
+                    s.flushCommands()
+
+                for key, _ in self._selector.select(READ_TIMEOUT):
+                    if key.data is None:
+                        self._drainWake()
+                    else:
+                        self._read(key.data)
+        finally:
+            for s in list(self.sessions):
+                self._detach(s)
+                s.close()
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
+
+    def _applyPending(self):
+        while True:
+            try:
+                add, s = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            if add:
+                if s in self.sessions or not s.connected:
+                    continue
+                self.sessions.append(s)
+                try:
+                    self._selector.register(s.ser.fileno(), selectors.EVENT_READ, s)
+                except (AttributeError, OSError, ValueError, serial.SerialException):
+                    self._startReader(s)
+            elif s in self.sessions:
+                self._detach(s)
+                s.close()
+
+    def _startReader(self, s):
+        s.ser.timeout = READ_TIMEOUT
+        stop = threading.Event()
+        thread = threading.Thread(target=self._readLoop, args=(s, stop), daemon=True)
+        self._readers[s] = (thread, stop)
+        thread.start()
+
+    def _readLoop(self, s, stop):
+        while not stop.is_set():
+            try:
+                s.readAvailable()
+            except (serial.SerialException, OSError) as e:
+                # el cierre lo hace el IOLoop, dueño de self.sessions
+                if not stop.is_set():
+                    s.error = e
+                    self.remove(s)
+                return
+
+    def _detach(self, s):
+        self.sessions.remove(s)
+        s.loop = None
+        # lo encolado para este puerto ya no se va a escribir
+        while True:
+            try:
+                s.commands.get_nowait()
+            except queue.Empty:
+                break
+            s.dropped_commands += 1
+        if s in self._readers:
+            thread, stop = self._readers.pop(s)
+            stop.set()
+            thread.join(READ_TIMEOUT * 5)
+        else:
+            try:
+                self._selector.unregister(s.ser.fileno())
+            except (KeyError, OSError, ValueError):
+                pass
+
+    def _read(self, s):
+        try:
+            s.readAvailable()
+        except (serial.SerialException, OSError) as e:
+            s.error = e
+            self._detach(s)
+            s.close()
+
+    def _drainWake(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
@@ -0,0 +1,188 @@
+"""Simulador de planta + firmware sobre un pseudo-terminal (Linux).
+
+Habla el mismo protocolo que la GUI:
+    entrada  "m=0|1", "b=0|1", "kd=..,ki=..,kp=..", o una referencia suelta
+    salida   "angulo,pwm,t_ms" por muestra, o tramas de binproto con b=1
+
+El lazo de control corre a CONTROL_PERIOD como en la placa (integral y
+derivada por periodo); la telemetría se genera a `rate` muestras/s y la
+planta (motor DC: velocidad de primer orden + integrador) se integra con
+ese mismo paso. En lazo abierto la referencia se aplica directo como PWM.
+
+    python simulator.py --rate 5000
+"""
+import argparse
+import os
+import select
+import threading
+import time
+import tty
+
+import numpy as np
+
+from binproto import encodeFrames
+from firmware import CONTROL_PERIOD, FIRMWARE_PID, PWM_MAX
+
+MAX_CATCHUP = 0.1
+
+
+class MotorPlant:
+    """Posición de un motor DC: omega' = (gain * u - omega) / tau, theta' = omega."""
+
+    def __init__(self, tau=0.08, gain=720.0):
+        self.tau = tau
+        self.gain = gain
+        self.theta = 0.0
+        self.omega = 0.0
+
+    def step(self, u, dt):
+        self.omega += (self.gain * u - self.omega) * dt / self.tau
+        self.theta += self.omega * dt
+        return self.theta
+
+
+class Firmware:
+    def __init__(self, kp=FIRMWARE_PID[0], ki=FIRMWARE_PID[1], kd=FIRMWARE_PID[2]):
+        self.mode = 0
+        self.binary = False
+        self.ref = 0.0
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.pwm = 0.0
+        self._integ = 0.0
+        self._prev_err = 0.0
+
+    def handle(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            if line.startswith('m='):
+                self.mode = int(line[2:])
+                self._integ = 0.0
+            elif line.startswith('b='):
+                self.binary = line[2:] == '1'
+            elif '=' in line:
+                for part in line.split(','):
+                    key, _, value = part.partition('=')
+                    if key.strip() in ('kp', 'ki', 'kd'):
+                        setattr(self, key.strip(), float(value))
+            else:
+                self.ref = float(line)
+        except ValueError:
+            pass
+
+    def control(self, theta):
+        if self.mode == 1:
+            self.pwm = max(-PWM_MAX, min(PWM_MAX, self.ref))
+            return self.pwm
+        err = self.ref - theta
+        self._integ += err
+        out = self.kp * err + self.ki * self._integ + self.kd * (err - self._prev_err)
+        self._prev_err = err
+        self.pwm = max(-PWM_MAX, min(PWM_MAX, out))
+        return self.pwm
+
+
+class Simulator(threading.Thread):
+
+    def __init__(self, rate=1000.0, plant=None, firmware=None, tick=0.002):
+        super().__init__(daemon=True)
+        self.rate = float(rate)
+        self.tick = tick
+        self.plant = plant or MotorPlant()
+        self.firmware = firmware or Firmware()
+        self.port = None
+        self.produced = 0
+        self.t_start = None
+        self._master = None
+        self._slave = None
+        self._cmd_buf = b''
+        self._stop_evt = threading.Event()
+
+    def open(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        return self.port
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def close(self):
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def run(self):
+        dt = 1.0 / self.rate
+        per_control = max(1, int(round(CONTROL_PERIOD * self.rate)))
+        u = 0.0
+        self.t_start = time.monotonic()
+        while not self._stop_evt.wait(self.tick):
+            self._readCommands()
+            due = int((time.monotonic() - self.t_start) * self.rate) - self.produced
+            due = min(due, int(self.rate * MAX_CATCHUP) + 1)
+            if due <= 0:
+                continue
+
+            ang = np.empty(due)
+            pwm = np.empty(due)
+            for i in range(due):
+                k = self.produced + i
+                if k % per_control == 0:
+                    u = self.firmware.control(self.plant.theta) / PWM_MAX
+                ang[i] = self.plant.step(u, dt)
+                pwm[i] = self.firmware.pwm
+            t_ms = (self.produced + np.arange(1, due + 1)) * (1000.0 * dt)
+            self.produced += due
+
+            if self.firmware.binary:
+                data = encodeFrames(ang, t_ms)
+            else:
+                data = ''.join(f"{a:.2f},{p:.0f},{t:.3f}\n" for a, p, t in
+                               zip(ang.tolist(), pwm.tolist(), t_ms.tolist())).encode('utf-8')
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self._master, view):]
+            except OSError:
+                break
+
+    def _readCommands(self):
+        while select.select([self._master], [], [], 0)[0]:
+            try:
+                chunk = os.read(self._master, 4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            self._cmd_buf += chunk
+        while b'\n' in self._cmd_buf:
+            line, _, self._cmd_buf = self._cmd_buf.partition(b'\n')
+            self.firmware.handle(line.decode('utf-8', errors='ignore'))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulador de motor + firmware en un pty")
+    ap.add_argument('--rate', type=float, default=1000.0, help="muestras/s de telemetría")
+    args = ap.parse_args()
+
+    sim = Simulator(args.rate)
+    print(sim.open(), flush=True)
+    sim.start()
+    try:
+        while sim.is_alive():
+            sim.join(0.5)
+    except KeyboardInterrupt:
+        sim.stop()
+    sim.close()
+
+
+if __name__ == "__main__":
+    main()
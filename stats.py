@@ -0,0 +1,160 @@
+"""Instrumentación del pipeline: histogramas de latencia por etapa y contadores.
+
+Cada `DeviceSession` tiene un `PipelineStats`. Las etapas se miden por lote
+(no por muestra) con el reloj monotónico:
+
+    read    ser.read() en el IOLoop
+    parse   parser/decoder sobre el bloque leído
+    push    paso del lote a history/pyramid/recorder en el tick de la GUI
+    render  setData de las curvas del eje
+    gap     recepción en el host - t del firmware, respecto del mínimo visto
+            (el reloj del firmware no está sincronizado con el del host)
+
+Los histogramas tienen cubetas fijas en potencias de 2 de microsegundos.
+Se mide una de cada `every` llamadas por etapa (`due`); los contadores de
+bytes/lotes/muestras son exactos. `add` es solo un list.append (se llama
+desde el hilo de E/S y desde la GUI); las duraciones se agrupan en
+cubetas en `flush`, que corre al pedir un snapshot. Con `enabled` en
+False las etapas no se miden; los contadores propios de la sesión
+(malformadas, descartes) siguen.
+"""
+import bisect
+import itertools
+import json
+import math
+import time
+
+N_BUCKETS = 24
+TIME_EVERY = 32
+STAGES = ('read', 'parse', 'push', 'render', 'gap')
+
+
+class Histogram:
+    """Cubeta i: [2**(i-1), 2**i) µs; la 0 es < 1 µs y la última acumula el resto."""
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.calls = 0
+        self._pending = []
+        self.add = self._pending.append
+
+    def clear(self):
+        self.calls = 0
+        self.counts = [0] * N_BUCKETS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        del self._pending[:]
+
+    def take(self) -> list:
+        # del [:k] deja lo que el otro hilo agregue mientras tanto
+        k = len(self._pending)
+        x = self._pending[:k]
+        del self._pending[:k]
+        return x
+
+    def addValues(self, seconds):
+        if not seconds:
+            return
+        counts = self.counts
+        last = N_BUCKETS - 1
+        for x in seconds:
+            exp = math.frexp(math.floor(max(x, 0.0) * 1e6))[1]
+            counts[exp if exp < last else last] += 1
+        self.n += len(seconds)
+        self.total += sum(seconds)
+        self.max = max(self.max, max(seconds))
+
+    def flush(self):
+        self.addValues(self.take())
+
+    def percentile(self, p: float) -> float:
+        """Borde superior (s) de la cubeta que contiene el percentil p."""
+        if not self.n:
+            return 0.0
+        i = bisect.bisect_left(list(itertools.accumulate(self.counts)), p / 100.0 * self.n)
+        return min(2.0 ** i * 1e-6, self.max)
+
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            'n': self.n,
+            'mean_us': self.mean() * 1e6,
+            'p50_us': self.percentile(50) * 1e6,
+            'p99_us': self.percentile(99) * 1e6,
+            'max_us': self.max * 1e6,
+            'buckets': list(self.counts),
+        }
+
+
+class PipelineStats:
+
+    def __init__(self, enabled=False, every=TIME_EVERY):
+        self.enabled = enabled
+        self.every = every
+        self.stages = {name: Histogram() for name in STAGES}
+        self.bytes = 0
+        self.batches = 0
+        self.samples = 0
+        self._gap_base = None
+        self.t_reset = time.monotonic()
+
+    def reset(self):
+        for h in self.stages.values():
+            h.clear()
+        self.bytes = self.batches = self.samples = 0
+        self._gap_base = None
+        self.t_reset = time.monotonic()
+
+    def due(self, stage) -> bool:
+        # cada etapa la llama un solo hilo, así que el contador no se pisa
+        h = self.stages[stage]
+        h.calls += 1
+        return h.calls % self.every == 0
+
+    def flush(self):
+        for name, h in self.stages.items():
+            if name != 'gap':
+                h.flush()
+        gaps = self.stages['gap'].take()
+        if gaps:
+            base = min(gaps)
+            if self._gap_base is None or base < self._gap_base:
+                self._gap_base = base
+            self.stages['gap'].addValues([g - self._gap_base for g in gaps])
+
+    def snapshot(self, **counters) -> dict:
+        self.flush()
+        elapsed = max(time.monotonic() - self.t_reset, 1e-9)
+        out = {
+            'ts': time.time(),
+            'elapsed_s': elapsed,
+            'bytes': self.bytes,
+            'batches': self.batches,
+            'samples': self.samples,
+            'bytes_per_s': self.bytes / elapsed,
+            'samples_per_s': self.samples / elapsed,
+            'time_every': self.every,
+        }
+        out.update(counters)
+        out['stages'] = {name: h.snapshot() for name, h in self.stages.items()}
+        return out
+
+    def dump(self, fp, snap: dict):
+        fp.write(json.dumps(snap) + '\n')
+
+    def summary(self, snap: dict, counters: dict) -> str:
+        lines = [f"{snap['samples_per_s']:,.0f} muestras/s  {snap['bytes_per_s'] / 1024:,.1f} KiB/s"]
+        for name in STAGES:
+            st = snap['stages'][name]
+            lines.append(f"{name:<6} p50 {st['p50_us']:>8,.0f}  p99 {st['p99_us']:>8,.0f}  "
+                         f"máx {st['max_us']:>8,.0f} µs")
+        items = [f"{k}={v}" for k, v in counters.items()]
+        for i in range(0, len(items), 3):
+            lines.append("  ".join(items[i:i + 3]))
+        return "\n".join(lines)
@@ -0,0 +1,133 @@
+"""Métricas de respuesta al escalón calculadas en línea, por lote.
+
+`StepTracker.update(t, y, ref)` recibe cada lote (tiempos relativos, ángulo
+y referencia por muestra o escalar). Cada cambio de referencia abre un
+escalón nuevo; el resultado del escalón en curso se actualiza con
+operaciones vectorizadas sobre el lote y estado O(1) entre lotes:
+
+    rise       tiempo de 10 % a 90 % del escalón (s)
+    overshoot  sobrepaso máximo respecto del escalón (%)
+    settling   desde el escalón hasta entrar por última vez en la banda (s)
+    ess        error medio desde que entró en la banda (°); si todavía no
+               entró, el error actual
+    iae/ise/itae  integrales de |e|, e² y (t - t_escalón)·|e|
+
+La banda de establecimiento es relativa al tamaño del escalón
+(|e| <= band·|A|). Cada resultado lleva los kp/ki/kd vigentes. En lazo
+abierto la referencia es un PWM, así que ahí no se abren escalones.
+"""
+import numpy as np
+
+SETTLING_BAND = 0.02
+MAX_STEPS = 1000
+
+
+def newStep(t, ref0, ref, y0, pid=None):
+    kp, ki, kd = pid if pid else (None, None, None)
+    return {
+        't_step': t, 'ref0': ref0, 'ref': ref, 'size': ref - y0,
+        'rise': None, 'overshoot': 0.0, 'settling': None, 'ess': None,
+        'iae': 0.0, 'ise': 0.0, 'itae': 0.0,
+        'kp': kp, 'ki': ki, 'kd': kd,
+    }
+
+
+class StepTracker:
+
+    def __init__(self, band=SETTLING_BAND):
+        self.band = band
+        self.steps = []
+        self.current = None
+        self._ref = None
+        self._t_prev = None
+        self._y_prev = None
+        self._reset()
+
+    def _reset(self):
+        self._t10 = None
+        self._peak = 0.0
+        self._t_in = None
+        self._in_sum = 0.0
+        self._in_n = 0
+
+    def update(self, t, y, ref, pid=None, mode=0):
+        ref = np.broadcast_to(np.asarray(ref, dtype=np.float64), t.shape)
+        if self._ref is None:
+            self._ref = ref[0]
+            self._t_prev = t[0]
+            self._y_prev = y[0]
+
+        # cortes donde cambia la referencia; cada tramo tiene una sola
+        cuts = np.flatnonzero(ref[1:] != ref[:-1]) + 1
+        if ref[0] != self._ref:
+            cuts = np.concatenate(([0], cuts))
+        bounds = np.concatenate((cuts, [t.shape[0]]))
+
+        i = 0
+        for j in bounds:
+            if j > i:
+                self._segment(t[i:j], y[i:j])
+            if j < t.shape[0]:
+                self._open(t[j], ref[j], pid, mode)
+            i = j
+
+    def _open(self, t, ref, pid, mode):
+        self.current = None
+        if mode == 0:
+            self.current = newStep(float(t), float(self._ref), float(ref), float(self._y_prev), pid)
+            self.steps.append(self.current)
+            if len(self.steps) > MAX_STEPS:
+                del self.steps[0]
+        self._ref = ref
+        self._reset()
+
+    def _segment(self, t, y):
+        t_prev, self._t_prev = self._t_prev, t[-1]
+        self._y_prev = y[-1]
+        s = self.current
+        if s is None:
+            return
+
+        r = s['ref']
+        a = s['size']
+        e = r - y
+        ae = np.abs(e)
+        dt = np.diff(t, prepend=t_prev)
+        s['iae'] += float(np.dot(ae, dt))
+        s['ise'] += float(np.dot(e * e, dt))
+        s['itae'] += float(np.dot((t - s['t_step']) * ae, dt))
+
+        if a == 0.0:
+            return
+        # avance normalizado: 0 al escalón, 1 en la referencia
+        p = 1.0 - e / a
+        if s['rise'] is None:
+            if self._t10 is None:
+                k = np.argmax(p >= 0.1)
+                if p[k] >= 0.1:
+                    self._t10 = t[k]
+            if self._t10 is not None:
+                k = np.argmax(p >= 0.9)
+                if p[k] >= 0.9:
+                    s['rise'] = float(t[k] - self._t10)
+        self._peak = max(self._peak, float(p.max()))
+        s['overshoot'] = max(0.0, self._peak - 1.0) * 100.0
+
+        outside = np.flatnonzero(ae > self.band * abs(a))
+        if outside.size:
+            k = int(outside[-1]) + 1
+            self._t_in = t[k] if k < t.shape[0] else None
+            self._in_sum = 0.0
+            self._in_n = 0
+        else:
+            k = 0
+            if self._t_in is None:
+                self._t_in = t[0]
+        if self._t_in is not None:
+            self._in_sum += float(e[k:].sum())
+            self._in_n += t.shape[0] - k
+            s['settling'] = float(self._t_in - s['t_step'])
+            s['ess'] = self._in_sum / self._in_n
+        else:
+            s['settling'] = None
+            s['ess'] = float(e[-1])
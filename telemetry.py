@@ -0,0 +1,148 @@
+import warnings
+
+import numpy as np
+
+SMALL_BATCH_LINES = 32
+
+_EMPTY = np.empty(0, dtype=np.float64)
+_NL = ord('\n')
+_COMMA = ord(',')
+
+
+def parseLine(line: bytes):
+    try:
+        s = line.decode('ascii', errors='ignore').strip()
+        if not s:
+            return None
+
+        parts = s.split(',')
+        if len(parts) < 2:
+            return None
+
+        ang = float(parts[0])
+
+        if len(parts) >= 3:
+            t = float(parts[2])
+        else:
+            t = float(parts[1])
+
+        return t / 1000.0, ang
+    except ValueError:
+        return None
+
+
+class LineParser:
+    """Parser por lotes de líneas "angulo,...,t_ms".
+
+    `feed` recibe un chunk crudo, guarda la línea incompleta del final para
+    el siguiente chunk y devuelve (t_s, ang) como arreglos float64. Con 2
+    campos el tiempo es parts[1]; con 3 o más, parts[2].
+    """
+
+    def __init__(self):
+        self._partial = b''
+        self.lines = 0
+        self.malformed = 0
+
+    def feed(self, chunk):
+        data = self._partial + bytes(chunk) if self._partial else bytes(chunk)
+        cut = data.rfind(b'\n')
+        if cut < 0:
+            self._partial = data
+            return _EMPTY, _EMPTY
+        self._partial = data[cut + 1:]
+        return self.parseLines(data[:cut])
+
+    def parseLines(self, body: bytes):
+        raw = np.frombuffer(body, dtype=np.uint8)
+        high = raw >= 0x80
+        if high.any():
+            # igual que decode('ascii', errors='ignore') en parseLine: sin esto el
+            # resultado dependería del tamaño del lote
+            raw = raw[~high]
+            body = raw.tobytes()
+        nl = np.flatnonzero(raw == _NL)
+        n = nl.shape[0] + 1
+        self.lines += n
+        if n < SMALL_BATCH_LINES:
+            return self._parseEach(body.split(b'\n'))
+
+        # comas antes del inicio/fin de cada línea -> comas por línea
+        commas = np.flatnonzero(raw == _COMMA)
+        starts = np.empty(n, dtype=np.int64)
+        starts[0] = 0
+        starts[1:] = nl + 1
+        ends = np.empty(n, dtype=np.int64)
+        ends[:-1] = nl
+        ends[-1] = raw.shape[0]
+        before = np.searchsorted(commas, starts)
+        ncomma = np.searchsorted(commas, ends) - before
+
+        k = int(ncomma[0]) + 1
+        if k >= 2 and (ncomma == k - 1).all():
+            vals = self._parseUniform(body, n, k)
+            if vals is not None:
+                return vals[:, 2 if k >= 3 else 1] / 1000.0, vals[:, 0].copy()
+
+        first = before + np.arange(n)
+
+        fields = body.replace(b'\n', b',').split(b',')
+
+        short = ncomma == 0
+        if short.any():
+            for i in np.flatnonzero(short):
+                if fields[first[i]].strip():
+                    self.malformed += 1
+
+        ok = ~short
+        ang_idx = first[ok]
+        t_idx = ang_idx + np.where(ncomma[ok] >= 2, 2, 1)
+        if ang_idx.shape[0] == 0:
+            return _EMPTY, _EMPTY
+
+        arr = np.array(fields, dtype=np.bytes_)
+        try:
+            ang = arr[ang_idx].astype(np.float64)
+            t = arr[t_idx].astype(np.float64)
+        except ValueError:
+            return self._parseSlow(arr, ang_idx, t_idx)
+        return t / 1000.0, ang
+
+    def _parseUniform(self, body, n, k):
+        # todas las líneas con k campos numéricos: un solo pase en C
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            try:
+                vals = np.fromstring(body.replace(b'\n', b','), dtype=np.float64, sep=',')
+            except ValueError:
+                return None
+        if vals.shape[0] != n * k:
+            return None
+        return vals.reshape(n, k)
+
+    def _parseEach(self, lines):
+        t_out = []
+        ang_out = []
+        for line in lines:
+            sample = parseLine(line)
+            if sample is None:
+                if line.strip():
+                    self.malformed += 1
+                continue
+            t_out.append(sample[0])
+            ang_out.append(sample[1])
+        return np.array(t_out, dtype=np.float64), np.array(ang_out, dtype=np.float64)
+
+    def _parseSlow(self, arr, ang_idx, t_idx):
+        t_out = np.empty(ang_idx.shape[0], dtype=np.float64)
+        ang_out = np.empty(ang_idx.shape[0], dtype=np.float64)
+        k = 0
+        for ia, it in zip(ang_idx, t_idx):
+            try:
+                ang_out[k] = float(arr[ia])
+                t_out[k] = float(arr[it])
+            except ValueError:
+                self.malformed += 1
+                continue
+            k += 1
+        return t_out[:k] / 1000.0, ang_out[:k]
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+
+from binproto import FRAME_SIZE, FrameDecoder, crc16Rows, encodeFrames
+
+
+def frames(n=200):
+    ang = np.linspace(-90.0, 90.0, n, dtype=np.float32)
+    t_ms = np.arange(n, dtype=np.uint32) * 10 + 1000
+    return ang, t_ms, encodeFrames(ang, t_ms)
+
+
+def feedAll(dec, chunks):
+    t, ang = zip(*(dec.feed(c) for c in chunks))
+    return np.concatenate(t), np.concatenate(ang)
+
+
+def test_crc_check_value():
+    # valor de verificación de CRC-16/CCITT-FALSE
+    rows = np.frombuffer(b'123456789', dtype=np.uint8).reshape(1, -1)
+    assert int(crc16Rows(rows)[0]) == 0x29B1
+
+
+def test_roundtrip():
+    ang, t_ms, data = frames()
+    t, a = FrameDecoder().feed(data)
+    np.testing.assert_array_equal(a, ang.astype(np.float64))
+    np.testing.assert_array_equal(t, t_ms / 1000.0)
+
+
+def test_chunk_splits():
+    ang, t_ms, data = frames()
+    rng = np.random.default_rng(1)
+    cuts = np.sort(rng.choice(np.arange(1, len(data)), size=60, replace=False))
+    chunks = [data[i:j] for i, j in zip(np.r_[0, cuts], np.r_[cuts, len(data)])]
+    dec = FrameDecoder()
+    t, a = feedAll(dec, chunks)
+    np.testing.assert_array_equal(a, ang.astype(np.float64))
+    assert dec.frames == ang.shape[0]
+    assert dec.malformed == 0 and dec.skipped == 0
+
+
+def test_byte_at_a_time():
+    ang, _, data = frames(20)
+    t, a = feedAll(FrameDecoder(), [data[i:i + 1] for i in range(len(data))])
+    np.testing.assert_array_equal(a, ang.astype(np.float64))
+
+
+def test_frame_ending_in_sync_byte():
+    # trama cuyo último byte de CRC es A5: no se guarda como inicio de sincronía
+    for k in range(5000):
+        data = encodeFrames([float(k)], [k])
+        if data[-1] == 0xA5:
+            break
+    dec = FrameDecoder()
+    t, a = dec.feed(data)
+    assert a.tolist() == [float(k)]
+    assert dec.skipped == 0
+    t, a = dec.feed(data)
+    assert a.tolist() == [float(k)]
+    assert dec.skipped == 0 and dec.malformed == 0
+
+
+def test_resync_after_corruption():
+    ang, t_ms, data = frames(100)
+    buf = bytearray(data)
+    buf[10 * FRAME_SIZE + 5] ^= 0xFF           # CRC falla en la trama 10
+    buf[40 * FRAME_SIZE:40 * FRAME_SIZE] = b'\xa5\x5a\x00garbage'  # sincronía falsa
+    buf[0:0] = b'\x00\x13'                     # basura antes de la primera trama
+    dec = FrameDecoder()
+    t, a = feedAll(dec, [bytes(buf[i:i + 37]) for i in range(0, len(buf), 37)])
+
+    keep = np.ones(ang.shape[0], dtype=bool)
+    keep[10] = False
+    np.testing.assert_array_equal(a, ang[keep].astype(np.float64))
+    np.testing.assert_array_equal(t, t_ms[keep] / 1000.0)
+    assert dec.malformed >= 2
+
+
+def test_pty_loopback():
+    pty = pytest.importorskip('pty')
+    serial = pytest.importorskip('serial')
+    master, slave = pty.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.5)
+    try:
+        ang, t_ms, data = frames(500)
+        os.write(master, data)
+        dec = FrameDecoder()
+        got_t, got_a = [], []
+        while dec.frames < ang.shape[0]:
+            chunk = port.read(port.in_waiting or 1)
+            if not chunk:
+                break
+            t, a = dec.feed(chunk)
+            got_t.append(t)
+            got_a.append(a)
+        np.testing.assert_array_equal(np.concatenate(got_a), ang.astype(np.float64))
+        np.testing.assert_array_equal(np.concatenate(got_t), t_ms / 1000.0)
+    finally:
+        port.close()
+        os.close(master)
+        os.close(slave)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from decimate import ENGINES, Decimator
+
+
+def signal(n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) * 1e-3
+    y = np.sin(t * 3.0) + rng.normal(0, 0.05, n)
+    # picos más separados que el bucket más ancho (dos en un bucket se reducen a uno)
+    spikes = np.arange(300, n - 300, 1100)
+    spikes += rng.integers(0, 200, spikes.shape[0])
+    y[spikes] += rng.choice([-1.0, 1.0], size=spikes.shape[0]) * rng.uniform(5, 20, spikes.shape[0])
+    return t, y, spikes
+
+
+@pytest.mark.parametrize('n_cols', [50, 333, 1000])
+def test_minmax_keeps_every_peak_while_scrolling(n_cols):
+    t, y, spikes = signal(40000)
+    dec = Decimator('minmax')
+    window = 12000
+    for end in range(2000, t.shape[0] + 1, 1500):
+        start = max(0, end - window)
+        x_out, y_out = dec.decimate(t[start:end], y[start:end], start, n_cols)
+        assert x_out.shape[0] <= 2 * n_cols + 4
+        visible = spikes[(spikes >= start) & (spikes < end)]
+        assert np.isin(t[visible], x_out).all()
+        assert y_out.max() == y[start:end].max()
+        assert y_out.min() == y[start:end].min()
+        # las muestras devueltas son muestras reales, en orden
+        assert np.all(np.diff(x_out) > 0)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_cached_buckets_match_fresh_decimation(engine):
+    t, y, _ = signal(30000, seed=3)
+    cached = Decimator(engine)
+    for end in range(3000, t.shape[0] + 1, 700):
+        start = max(0, end - 9000)
+        x_c, y_c = cached.decimate(t[start:end], y[start:end], start, 400)
+        x_f, y_f = Decimator(engine).decimate(t[start:end], y[start:end], start, 400)
+        if engine == 'lttb':
+            # el ancla del primer bucket visible es x[0] solo si se calcula desde cero
+            x_c, y_c, x_f, y_f = x_c[2:], y_c[2:], x_f[2:], y_f[2:]
+        np.testing.assert_array_equal(x_c, x_f)
+        np.testing.assert_array_equal(y_c, y_f)
+
+
+def test_short_series_untouched():
+    t, y, _ = signal(500)
+    x_out, y_out = Decimator('lttb').decimate(t, y, 0, 400)
+    assert x_out is t and y_out is y
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Decimator().setEngine('cubic')
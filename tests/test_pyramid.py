@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from pyramid import MinMaxPyramid
+
+
+def signal(n, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) * 1e-3
+    y = np.sin(t * 3.0) + rng.normal(0, 0.05, n)
+    spikes = rng.choice(n, size=60, replace=False)
+    y[spikes] += rng.choice([-1.0, 1.0], size=60) * rng.uniform(5, 20, 60)
+    return t, y
+
+
+@pytest.mark.parametrize('batch', [1, 37, 4096])
+def test_keeps_every_peak(batch):
+    t, y = signal(60000, seed=batch)
+    p = MinMaxPyramid(raw_max=1 << 14)
+    for i in range(0, t.shape[0], batch):
+        p.extend(t[i:i + batch], y[i:i + batch], 0.0)
+    assert len(p) == t.shape[0]
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        t0, t1 = np.sort(rng.uniform(t[0], t[-1], 2))
+        n_px = int(rng.integers(20, 2000))
+        x_out, y_out, _ = p.query(t0, t1, n_px)
+        assert x_out.shape[0] <= 2 * n_px + 2 * (p.factor + 2)
+        inside = (t >= t0) & (t <= t1)
+        if not inside.any():
+            continue
+        assert y_out.max() >= y[inside].max()
+        assert y_out.min() <= y[inside].min()
+
+
+def test_raw_level_is_bounded():
+    p = MinMaxPyramid(raw_max=1 << 12)
+    t = np.arange(200000) * 1e-3
+    for i in range(0, t.shape[0], 1000):
+        p.extend(t[i:i + 1000], t[i:i + 1000], 0.0)
+    assert p.raw.n - p.raw.base <= p.raw_max + 2 * p.raw.chunk
+    # un zoom cercano al final sigue usando las muestras crudas
+    x, y, _ = p.query(t[-100], t[-1], 1000)
+    assert x.shape[0] >= 100 and np.all(np.diff(x) > 0)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import recorder
+from recorder import ReplaySource, SessionLog, SessionRecorder
+
+
+def record(path, n, batch, stride=None, commands=()):
+    if stride:
+        recorder.INDEX_STRIDE = stride
+    rec = SessionRecorder(path, mode=1, pid=[1.0, 2.0, 3.0])
+    t = np.arange(n) * 1e-3
+    for i in range(0, n, batch):
+        rec.addSamples(t[i:i + batch], np.sin(t[i:i + batch]), np.floor(t[i:i + batch]))
+    for tc, text in commands:
+        rec.addCommand(tc, text)
+    rec.start()
+    rec.stop()
+    rec.join()
+    return rec, t
+
+
+@pytest.fixture(autouse=True)
+def stride():
+    saved = recorder.INDEX_STRIDE
+    yield
+    recorder.INDEX_STRIDE = saved
+
+
+def test_round_trip(tmp_path):
+    rec, t = record(str(tmp_path), 10000, 333, commands=[(1.5, 'm=0'), (2.0, 'kd=1,ki=0,kp=2\n')])
+    log = SessionLog(str(tmp_path))
+    assert rec.records == len(log) == t.shape[0]
+    np.testing.assert_array_equal(log.samples['t'], t)
+    np.testing.assert_array_equal(log.samples['ang'], np.sin(t))
+    np.testing.assert_array_equal(log.samples['ref'], np.floor(t))
+    assert log.commands == [(1.5, 'm=0'), (2.0, 'kd=1,ki=0,kp=2')]
+    assert log.meta['mode'] == 1 and log.meta['pid'] == [1.0, 2.0, 3.0]
+
+
+def test_locate_uses_index(tmp_path):
+    _, t = record(str(tmp_path), 5000, 97, stride=256)
+    log = SessionLog(str(tmp_path))
+    assert log.stride == 256
+    np.testing.assert_array_equal(log.index, t[::256])
+    for q in np.r_[-1.0, t[::61], t[::256] + 1e-4, t[-1], t[-1] + 1.0]:
+        assert log.locate(q) == np.searchsorted(t, q, side='left')
+    seg = log.between(1.0, 2.5)
+    np.testing.assert_array_equal(seg['t'], t[(t >= 1.0) & (t < 2.5)])
+
+
+def test_replay_feeds_the_same_samples(tmp_path):
+    _, t = record(str(tmp_path), 20000, 1000)
+    replay = ReplaySource(str(tmp_path), speed=0.0)
+    assert replay.mode == 1 and replay.pid == (1.0, 2.0, 3.0)
+    replay.start()
+    got = 0
+    while got < t.shape[0]:
+        got += replay.pump()
+        if replay.finished and replay.batches.empty():
+            got += replay.pump()
+            break
+    replay.join(1.0)
+    t_v, y_v, r_v = replay.history.view()
+    assert replay.pyramid.raw.n == t.shape[0]
+    k = t.shape[0] - t_v.shape[0]
+    np.testing.assert_allclose(t_v, t[k:], atol=1e-9)
+    np.testing.assert_allclose(y_v, np.sin(t[k:]), atol=1e-6)
+    np.testing.assert_array_equal(r_v, np.floor(t[k:]))
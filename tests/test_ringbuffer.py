@@ -0,0 +1,36 @@
+import numpy as np
+
+from ringbuffer import SampleRing
+
+
+def test_matches_list_model_for_any_batches():
+    rng = np.random.default_rng(0)
+    ring = SampleRing(1000)
+    t_all = []
+    t0 = 0.0
+    for _ in range(300):
+        n = int(rng.integers(0, 400)) if rng.random() > 0.02 else 2500
+        t = t0 + np.arange(n) * 1e-3
+        t0 += n * 1e-3
+        ring.extend(t, -t, 1.0)
+        t_all.extend(t.tolist())
+        if rng.random() < 0.2:
+            ring.trimBefore(t0 - 0.3)
+            t_all = [x for x in t_all if x >= t0 - 0.3]
+        t_all = t_all[-ring.capacity:]
+
+        t_v, y_v, r_v = ring.view()
+        np.testing.assert_array_equal(t_v, t_all)
+        np.testing.assert_array_equal(y_v, -t_v)
+        assert (r_v == 1.0).all()
+        assert ring.appended - ring.evicted == len(ring)
+        assert ring.startIndex() == ring.evicted
+        if len(ring):
+            assert ring.lastTime() == t_all[-1]
+
+
+def test_view_is_not_a_copy():
+    ring = SampleRing(10)
+    ring.extend(np.arange(5.0), 0.0, 0.0)
+    t, _, _ = ring.view()
+    assert np.shares_memory(t, ring._t)
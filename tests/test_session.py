@@ -0,0 +1,125 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from binproto import encodeFrames
+from session import READ_TIMEOUT, DeviceSession, IOLoop
+
+pty = pytest.importorskip('pty')
+
+
+class NoFileno:
+    """Puerto como en Windows: sin fileno(), el IOLoop le da un hilo lector."""
+
+    def __init__(self, ser):
+        object.__setattr__(self, '_ser', ser)
+
+    def __getattr__(self, name):
+        if name == 'fileno':
+            raise AttributeError(name)
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._ser, name, value)
+
+
+class WindowsSession(DeviceSession):
+
+    def open(self):
+        super().open()
+        self.ser = NoFileno(self.ser)
+
+
+def waitFor(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.005)
+    return cond()
+
+
+def readMaster(fd, n, timeout=2.0):
+    out = b''
+    end = time.monotonic() + timeout
+    os.set_blocking(fd, False)
+    while len(out) < n and time.monotonic() < end:
+        try:
+            out += os.read(fd, 4096)
+        except BlockingIOError:
+            time.sleep(0.005)
+    return out
+
+
+@pytest.fixture(params=[DeviceSession, WindowsSession], ids=['selector', 'reader'])
+def wired(request):
+    master, slave = pty.openpty()
+    s = request.param(os.ttyname(slave), 115200)
+    s.open()
+    loop = IOLoop()
+    loop.start()
+    loop.add(s)
+    assert waitFor(lambda: s in loop.sessions)
+    yield s, loop, master
+    loop.stop()
+    loop.join(1.0)
+    os.close(slave)
+    try:
+        os.close(master)
+    except OSError:
+        pass
+
+
+def pumpUntil(s, n, timeout=2.0):
+    got = 0
+    end = time.monotonic() + timeout
+    while got < n and time.monotonic() < end:
+        got += s.pump()
+        time.sleep(0.002)
+    return got
+
+
+def test_ascii_samples_reach_history(wired):
+    s, _, master = wired
+    ang = np.arange(500) * 0.5
+    os.write(master, b''.join(f"{a:.2f},0,{i + 1}\n".encode() for i, a in enumerate(ang)))
+    assert pumpUntil(s, ang.shape[0]) == ang.shape[0]
+    _, y, _ = s.history.view()
+    np.testing.assert_array_equal(y, ang)
+    assert s.lines == ang.shape[0] and s.malformed == 0
+
+
+def test_commands_are_written(wired):
+    s, _, master = wired
+    assert s.setReference('12.5')
+    assert s.setPID('1', '0.5', '2')
+    expected = b"12.5\nkd=2,ki=0.5,kp=1\n"
+    assert readMaster(master, len(expected)) == expected
+    assert s.pid == (1.0, 0.5, 2.0)
+
+
+def test_binary_switch_on_reading_thread(wired):
+    s, _, master = wired
+    assert s.setBinary(True)
+    assert readMaster(master, 4) == b"b=1\n"
+    ang = np.linspace(-10, 10, 300)
+    os.write(master, encodeFrames(ang, np.arange(300) + 1))
+    assert pumpUntil(s, 300) == 300
+    assert s.binary and s.lines == 300 and s.malformed == 0
+    np.testing.assert_allclose(s.history.view()[1], ang.astype(np.float32))
+
+
+def test_port_failure_stops_accepting_commands(wired):
+    s, loop, master = wired
+    os.close(master)
+    assert waitFor(lambda: s.error is not None and s not in loop.sessions, 5 * READ_TIMEOUT + 2.0)
+    assert not s.connected
+    assert not s.setReference('10')
+    assert s.dropped_commands == 0
+
+
+def test_send_without_loop():
+    s = DeviceSession('/no/existe', 115200)
+    assert not s.send("m=0\n")
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from stepmetrics import StepTracker
+
+KEYS = ('t_step', 'ref', 'size', 'rise', 'overshoot', 'settling', 'ess', 'iae', 'ise', 'itae')
+
+
+def response(n=6000, dt=0.001):
+    # segundo orden subamortiguado que sigue escalones de referencia
+    t = np.arange(n) * dt
+    ref = np.where(t < 1.0, 0.0, np.where(t < 3.5, 90.0, 30.0))
+    y = np.zeros(n)
+    v = 0.0
+    wn, zeta = 12.0, 0.35
+    for i in range(1, n):
+        acc = wn * wn * (ref[i - 1] - y[i - 1]) - 2 * zeta * wn * v
+        v += acc * dt
+        y[i] = y[i - 1] + v * dt
+    return t, y, ref
+
+
+def track(batch):
+    t, y, ref = response()
+    tr = StepTracker()
+    for i in range(0, t.shape[0], batch):
+        tr.update(t[i:i + batch], y[i:i + batch], ref[i:i + batch], pid=(1.0, 0.0, 0.5))
+    return tr.steps
+
+
+def test_batch_size_independent():
+    ref_steps = track(6000)
+    assert len(ref_steps) == 2
+    for batch in (1, 17, 80, 1024):
+        steps = track(batch)
+        assert len(steps) == len(ref_steps)
+        for a, b in zip(steps, ref_steps):
+            for k in KEYS:
+                if b[k] is None:
+                    assert a[k] is None, k
+                else:
+                    assert a[k] == pytest.approx(b[k], rel=1e-9, abs=1e-9), (batch, k)
+
+
+def test_metrics_sane():
+    up, down = track(100)
+    assert up['ref'] == 90.0 and down['ref'] == 30.0
+    assert up['rise'] > 0 and up['overshoot'] > 0
+    assert up['settling'] is not None and up['settling'] < 2.5
+    assert up['kp'] == 1.0
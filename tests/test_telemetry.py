@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from telemetry import SMALL_BATCH_LINES, LineParser, parseLine
+
+LINES = [
+    b"12.5,0,1000.0",
+    b"-3.25,2000.5",
+    b"7,1,2500,extra",
+    b"",
+    b"basura",
+    b"1.0,x,3000",
+    b"4.5,0,3\xb01.0",           # byte no ASCII en el medio de un número
+    b"\xff\xfe9.75,0,3500",      # no UTF-8 al principio
+    b"  2.0 , 0 , 4000 ",
+]
+
+
+def expected(lines):
+    out = [parseLine(line) for line in lines]
+    out = [s for s in out if s is not None]
+    return np.array([s[0] for s in out]), np.array([s[1] for s in out])
+
+
+@pytest.mark.parametrize('repeat', [1, SMALL_BATCH_LINES * 4])
+def test_matches_parseLine(repeat):
+    lines = LINES * repeat
+    t, ang = LineParser().feed(b"\n".join(lines) + b"\n")
+    t_ref, ang_ref = expected(lines)
+    np.testing.assert_array_equal(t, t_ref)
+    np.testing.assert_array_equal(ang, ang_ref)
+
+
+def test_uniform_batch_matches_parseLine():
+    lines = [f"{a:.2f},0,{k * 0.1:.3f}".encode() for k, a in enumerate(np.linspace(-90, 90, 500))]
+    t, ang = LineParser().feed(b"\n".join(lines) + b"\n")
+    t_ref, ang_ref = expected(lines)
+    np.testing.assert_array_equal(t, t_ref)
+    np.testing.assert_array_equal(ang, ang_ref)
+
+
+def test_chunk_size_independent():
+    data = b"\n".join(LINES * 50) + b"\n"
+    whole = LineParser()
+    t_ref, ang_ref = whole.feed(data)
+    for size in (1, 7, 64, 1000):
+        p = LineParser()
+        t, ang = zip(*(p.feed(data[i:i + size]) for i in range(0, len(data), size)))
+        np.testing.assert_array_equal(np.concatenate(t), t_ref)
+        np.testing.assert_array_equal(np.concatenate(ang), ang_ref)
+        assert p.malformed == whole.malformed
+
+
+def test_partial_line_kept():
+    p = LineParser()
+    t, _ = p.feed(b"1.0,0,10\n2.0,0,2")
+    assert t.tolist() == [0.01]
+    t, ang = p.feed(b"0\n")
+    assert t.tolist() == [0.02] and ang.tolist() == [2.0]
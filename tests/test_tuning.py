@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import tuning
+from firmware import FIRMWARE_PID
+from tuning import PlantModel, gainGrid, rank, stepResponse
+
+MODEL = PlantModel(gain=2.8, tau=0.08, delay=0.02)
+
+
+def test_gain_grid_shape():
+    kp, ki, kd = gainGrid((1, 3, 3), (0, 0.5, 2), (0, 1, 4))
+    assert kp.shape == ki.shape == kd.shape == (24,)
+    combos = set(zip(kp, ki, kd))
+    assert len(combos) == 24
+    assert (3.0, 0.5, 1.0) in combos
+    assert set(kp) == {1.0, 2.0, 3.0}
+
+
+@pytest.mark.parametrize('kp', [(0, float('nan'), 3), (0, 1, 0), (0, 1, 2.5), (float('inf'), 1, 2)])
+def test_gain_grid_rejects(kp):
+    with pytest.raises(ValueError):
+        gainGrid(kp, (0, 1, 1), (0, 1, 1))
+
+
+def test_gain_grid_cap(monkeypatch):
+    monkeypatch.setattr(tuning, 'MAX_COMBINATIONS', 100)
+    gainGrid((0, 1, 10), (0, 1, 10), (0, 1, 1))
+    with pytest.raises(ValueError):
+        gainGrid((0, 1, 10), (0, 1, 10), (0, 1, 2))
+
+
+def test_step_response():
+    kp, ki, kd = (np.array(v, dtype=float) for v in zip(FIRMWARE_PID, (0.5, 0.0, 0.0), (200.0, 0.0, 0.0)))
+    r = stepResponse(MODEL, kp, ki, kd, step=90.0, seconds=3.0)
+    assert set(r) >= set(tuning.RANK_KEYS) | {'rise', 'ess', 'ise', 'itae', 'settled'}
+    # el firmware y el P puro se establecen, la ganancia enorme no
+    assert list(r['settled']) == [True, True, False]
+    assert np.all(r['rise'][:2] > 0)
+    assert np.all(r['settling'][:2] < 3.0)
+    assert np.all(r['overshoot'] >= 0)
+    assert np.isnan(r['settling'][2])
+    # sin integral queda error estacionario, con integral no
+    assert abs(r['ess'][1]) > abs(r['ess'][0])
+
+
+def test_step_response_scalar_sign():
+    up = stepResponse(MODEL, *(np.array([v]) for v in FIRMWARE_PID), step=90.0)
+    down = stepResponse(MODEL, *(np.array([v]) for v in FIRMWARE_PID), step=-90.0)
+    for k in ('rise', 'overshoot', 'settling', 'iae'):
+        assert down[k][0] == pytest.approx(up[k][0])
+
+
+def test_step_response_rejects_zero():
+    with pytest.raises(ValueError):
+        stepResponse(MODEL, np.ones(1), np.zeros(1), np.zeros(1), step=0.0)
+
+
+def test_rank():
+    results = {
+        'settled': np.array([True, False, True, True, True]),
+        'iae': np.array([3.0, 0.1, 1.0, 1.0, 2.0]),
+        'settling': np.array([0.5, np.nan, 0.9, 0.4, 0.1]),
+        'overshoot': np.array([0.0, 0.0, 5.0, 5.0, 1.0]),
+    }
+    assert list(rank(results)) == [3, 2, 4, 0]
+    assert list(rank(results, key='settling', top=2)) == [4, 3]
+    assert list(rank(results, top=0)) == []
@@ -0,0 +1,336 @@
+"""Sintonía PID fuera de línea: identificación de la planta y barrido de ganancias.
+
+La planta se modela como primer orden + integrador con tiempo muerto, de
+PWM a ángulo:
+
+    G(s) = K e^{-Ls} / (s (tau s + 1))      K en °/s por unidad de PWM
+
+discretizada exacta (retención de orden cero) al periodo del lazo del
+firmware, con el mismo PID discreto que corre en la placa (integral y
+derivada por periodo, salida saturada a ±PWM_MAX). `ClosedLoop` simula N
+juegos de parámetros a la vez, vectorizado en NumPy.
+
+`identify` ajusta K, tau y L contra una sesión grabada (tramos en lazo
+abierto m=1, donde la referencia es el PWM, y en lazo cerrado con las
+ganancias vigentes) con búsqueda en grilla que se va achicando. `sweep`
+simula el escalón para cada combinación kp/ki/kd repartiendo bloques en un
+pool de procesos y `rank` ordena los resultados.
+
+    python tuning.py sesiones/<fecha>/<eje> [--step 90] [--workers N]
+"""
+import argparse
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from firmware import CONTROL_PERIOD, FIRMWARE_PID, PWM_MAX
+from recorder import SessionLog
+
+MAX_DELAY_STEPS = 20
+IDENT_SECONDS = 60.0
+IDENT_ROUNDS = 4
+SIM_SECONDS = 3.0
+MAX_SIM_SECONDS = 60.0
+SWEEP_CHUNK = 8192
+MAX_COMBINATIONS = 1_000_000
+RANK_KEYS = ('iae', 'settling', 'overshoot')
+
+
+class PlantModel:
+
+    def __init__(self, gain, tau, delay, rmse=None):
+        self.gain = float(gain)
+        self.tau = float(tau)
+        self.delay = float(delay)
+        self.rmse = rmse
+
+    def __repr__(self):
+        return f"PlantModel(gain={self.gain:.4g}, tau={self.tau:.4g}, delay={self.delay:.3g})"
+
+
+class ClosedLoop:
+    """Planta + PID del firmware para N juegos de parámetros (arrays o escalares).
+
+    prev_err es el error anterior del derivativo; el firmware arranca en 0,
+    por eso un escalón produce la patada derivativa. None toma el primer error.
+    """
+
+    def __init__(self, gain, tau, delay_steps, kp=0.0, ki=0.0, kd=0.0,
+                 theta0=0.0, omega0=0.0, prev_err=0.0, n=1, dt=CONTROL_PERIOD):
+        full = lambda v: np.broadcast_to(np.asarray(v, dtype=np.float64), (n,)).copy()
+        gain, tau = full(gain), full(tau)
+        self.dt = dt
+        self.a = np.exp(-dt / tau)
+        self.b = tau * (1.0 - self.a)
+        self.ku_theta = gain * (dt - self.b)
+        self.ku_omega = gain * (1.0 - self.a)
+        self.kp, self.ki, self.kd = full(kp), full(ki), full(kd)
+
+        self.theta = full(theta0)
+        self.omega = full(omega0)
+        self.integ = np.zeros(n)
+        self.prev = None if prev_err is None else full(prev_err)
+
+        self.delay = np.broadcast_to(np.asarray(delay_steps, dtype=np.intp), (n,))
+        self._hist = np.zeros((int(self.delay.max()) + 1, n)) if self.delay.any() else None
+        self._cols = np.arange(n)
+        self._k = 0
+
+    def step(self, ref, open_loop=False):
+        if open_loop:
+            pwm = np.clip(ref, -PWM_MAX, PWM_MAX)
+        else:
+            err = ref - self.theta
+            if self.prev is None:
+                self.prev = err
+            self.integ += err
+            pwm = np.clip(self.kp * err + self.ki * self.integ + self.kd * (err - self.prev),
+                          -PWM_MAX, PWM_MAX)
+            self.prev = err
+
+        if self._hist is None:
+            u = pwm
+        else:
+            m = self._hist.shape[0]
+            self._hist[self._k % m] = pwm
+            u = self._hist[(self._k - self.delay) % m, self._cols]
+        self._k += 1
+
+        self.theta = self.theta + self.b * self.omega + self.ku_theta * u
+        self.omega = self.a * self.omega + self.ku_omega * u
+        return self.theta
+
+
+def segments(log, seconds=IDENT_SECONDS, dt=CONTROL_PERIOD):
+    """Tramos de la sesión con modo y ganancias constantes, remuestreados a dt.
+
+    El modo y las ganancias iniciales salen de meta.json (si la grabación
+    los guardó) y los cambios de commands.log.
+    """
+    # solo se leen del disco los tramos que se usan (SessionLog.between)
+    samples = log.samples
+    if samples.shape[0] < 2:
+        return []
+    mode = int(log.meta.get('mode') or 0)
+    pid = tuple(log.meta.get('pid') or FIRMWARE_PID)
+    changes = [(samples['t'][0], mode, pid, 'start')]
+    for t, cmd in log.commands:
+        if cmd.startswith('m='):
+            mode = int(cmd[2:])
+            cause = 'mode'
+        elif cmd.startswith('kd='):
+            gains = dict(part.split('=') for part in cmd.split(','))
+            pid = (float(gains['kp']), float(gains['ki']), float(gains['kd']))
+            cause = 'pid'
+        else:
+            continue
+        changes.append((t, mode, pid, cause))
+
+    out = []
+    budget = {0: seconds, 1: seconds}
+    t_end = samples['t'][-1]
+    for i, (t0, mode, pid, cause) in enumerate(changes):
+        t1 = changes[i + 1][0] if i + 1 < len(changes) else t_end
+        t1 = min(t1, t0 + budget[mode])
+        if t1 - t0 < 20 * dt:
+            continue
+        seg = np.asarray(log.between(t0, t1))
+        if seg.shape[0] < 4:
+            continue
+        grid = np.arange(seg['t'][0], seg['t'][-1], dt)
+        ang = np.interp(grid, seg['t'], seg['ang'])
+        # referencia de la muestra más cercana (searchsorted se corre una por redondeo)
+        k = np.rint(np.interp(grid, seg['t'], np.arange(seg.shape[0]))).astype(np.intp)
+        out.append({'mode': mode, 'pid': pid, 'cause': cause, 'ang': ang, 'ref': seg['ref'][k]})
+        budget[mode] -= t1 - t0
+    return out
+
+
+def _segmentError(seg, gain, tau, delay_steps):
+    """Suma de errores cuadráticos del ángulo simulado para cada juego de parámetros."""
+    ang, ref = seg['ang'], seg['ref']
+    omega0 = (-3 * ang[0] + 4 * ang[1] - ang[2]) / (2 * CONTROL_PERIOD)
+    kp, ki, kd = seg['pid']
+    # al pasar a m=0 se supone que el lazo venía asentado (error previo 0); si no,
+    # el tramo sigue al anterior sin salto en el derivativo
+    prev_err = 0.0 if seg['cause'] == 'mode' else None
+    loop = ClosedLoop(gain, tau, delay_steps, kp, ki, kd, theta0=ang[0], omega0=omega0,
+                      prev_err=prev_err, n=gain.shape[0])
+    open_loop = seg['mode'] == 1
+    sse = np.zeros(gain.shape[0])
+    with np.errstate(over='ignore', invalid='ignore'):
+        for k in range(1, ang.shape[0]):
+            theta = loop.step(ref[k - 1], open_loop)
+            sse += (theta - ang[k]) ** 2
+    return np.where(np.isfinite(sse), sse, np.inf)
+
+
+def identify(log, rounds=IDENT_ROUNDS):
+    segs = segments(log)
+    if not segs:
+        raise ValueError("la sesión no tiene tramos suficientes para identificar")
+    n = sum(s['ang'].shape[0] - 1 for s in segs)
+
+    # grillas logarítmicas en K y tau, entera en el retardo; se achican alrededor del mejor
+    g_lo, g_hi = np.log(0.01), np.log(100.0)
+    t_lo, t_hi = np.log(0.005), np.log(2.0)
+    d_lo, d_hi = 0, MAX_DELAY_STEPS
+    for _ in range(rounds):
+        g, t, d = np.meshgrid(np.exp(np.linspace(g_lo, g_hi, 16)),
+                              np.exp(np.linspace(t_lo, t_hi, 16)),
+                              np.unique(np.linspace(d_lo, d_hi, 6).round().astype(np.intp)),
+                              indexing='ij')
+        g, t, d = g.ravel(), t.ravel(), d.ravel()
+        sse = sum(_segmentError(s, g, t, d) for s in segs)
+        best = int(np.argmin(sse))
+        gain, tau, delay = g[best], t[best], int(d[best])
+
+        g_span = (g_hi - g_lo) / 4
+        t_span = (t_hi - t_lo) / 4
+        g_lo, g_hi = np.log(gain) - g_span, np.log(gain) + g_span
+        t_lo, t_hi = np.log(tau) - t_span, np.log(tau) + t_span
+        d_lo, d_hi = max(0, delay - 2), min(MAX_DELAY_STEPS, delay + 2)
+
+    return PlantModel(gain, tau, delay * CONTROL_PERIOD, rmse=float(np.sqrt(sse[best] / n)))
+
+
+def identifyPath(path):
+    return identify(SessionLog(path))
+
+
+def gainGrid(kp, ki, kd):
+    """kp/ki/kd como (min, max, n) -> arrays planos con todas las combinaciones.
+
+    ValueError si un rango no es finito, si n no es un entero positivo o si
+    la grilla pasa de MAX_COMBINATIONS.
+    """
+    total = 1
+    for name, (lo, hi, n) in zip(('kp', 'ki', 'kd'), (kp, ki, kd)):
+        if not (math.isfinite(lo) and math.isfinite(hi)):
+            raise ValueError(f"{name}: min y max deben ser finitos")
+        if not math.isfinite(n) or n != int(n) or n < 1:
+            raise ValueError(f"{name}: n debe ser un entero positivo")
+        total *= int(n)
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"{total:,} combinaciones, el máximo es {MAX_COMBINATIONS:,}")
+    axes = [np.linspace(lo, hi, int(n)) for lo, hi, n in (kp, ki, kd)]
+    return [a.ravel() for a in np.meshgrid(*axes, indexing='ij')]
+
+
+def stepResponse(model, kp, ki, kd, step=90.0, seconds=SIM_SECONDS, band=0.02):
+    """Métricas del escalón 0 -> step para cada combinación (mismas que stepmetrics)."""
+    if step == 0 or not math.isfinite(step):
+        raise ValueError("el escalón debe ser finito y distinto de 0")
+    n = kp.shape[0]
+    dt = CONTROL_PERIOD
+    loop = ClosedLoop(model.gain, model.tau, int(round(model.delay / dt)), kp, ki, kd, n=n)
+    iae = np.zeros(n)
+    ise = np.zeros(n)
+    itae = np.zeros(n)
+    peak = np.zeros(n)
+    t10 = np.full(n, np.nan)
+    t90 = np.full(n, np.nan)
+    t_in = np.zeros(n)
+    tol = band * abs(step)
+    steps = int(round(seconds / dt))
+    with np.errstate(over='ignore', invalid='ignore'):
+        for k in range(steps):
+            t = (k + 1) * dt
+            theta = loop.step(step)
+            e = step - theta
+            ae = np.abs(e)
+            iae += ae * dt
+            ise += e * e * dt
+            itae += t * ae * dt
+            p = theta / step
+            np.fmax(peak, p, out=peak)
+            t10[np.isnan(t10) & (p >= 0.1)] = t
+            t90[np.isnan(t90) & (p >= 0.9)] = t
+            # la última salida de la banda fija el establecimiento
+            t_in[~(ae <= tol)] = t + dt
+
+    settled = np.isfinite(theta) & (ae <= tol) & (t_in < seconds)
+    return {
+        'kp': kp, 'ki': ki, 'kd': kd,
+        'rise': t90 - t10,
+        'overshoot': np.maximum(peak - 1.0, 0.0) * 100.0,
+        'settling': np.where(settled, t_in, np.nan),
+        'ess': np.where(settled, e, np.nan),
+        'iae': np.where(np.isfinite(iae), iae, np.inf),
+        'ise': np.where(np.isfinite(ise), ise, np.inf),
+        'itae': np.where(np.isfinite(itae), itae, np.inf),
+        'settled': settled,
+    }
+
+
+def _sweepChunk(model, kp, ki, kd, step, seconds, band):
+    return stepResponse(model, kp, ki, kd, step, seconds, band)
+
+
+def submitSweep(executor, model, kp, ki, kd, step=90.0, seconds=SIM_SECONDS, band=0.02, chunk=SWEEP_CHUNK):
+    return [executor.submit(_sweepChunk, model, kp[i:i + chunk], ki[i:i + chunk], kd[i:i + chunk],
+                            step, seconds, band)
+            for i in range(0, kp.shape[0], chunk)]
+
+
+def gather(futures):
+    parts = [f.result() for f in futures]
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def makeExecutor(workers=None):
+    # spawn: la GUI tiene hilos (IOLoop, grabación) y fork con hilos no es seguro
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=mp.get_context('spawn'))
+
+
+def sweep(model, kp, ki, kd, step=90.0, seconds=SIM_SECONDS, band=0.02, workers=None):
+    with makeExecutor(workers) as ex:
+        return gather(submitSweep(ex, model, kp, ki, kd, step, seconds, band))
+
+
+def rank(results, key='iae', top=20):
+    """Índices de las `top` mejores combinaciones que se establecen, por `key` y luego el resto."""
+    idx = np.flatnonzero(results['settled'])
+    others = [k for k in RANK_KEYS if k != key]
+    order = np.lexsort([results[k][idx] for k in reversed([key] + others)])
+    return idx[order[:top]]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Identifica la planta de una sesión y barre ganancias PID")
+    ap.add_argument('session')
+    ap.add_argument('--step', type=float, default=90.0)
+    ap.add_argument('--kp', default='0.5,10,50', help="min,max,n")
+    ap.add_argument('--ki', default='0,0.5,40')
+    ap.add_argument('--kd', default='0,15,50')
+    ap.add_argument('--by', choices=RANK_KEYS, default='iae')
+    ap.add_argument('--workers', type=int)
+    args = ap.parse_args()
+
+    if args.step == 0 or not math.isfinite(args.step):
+        ap.error("--step debe ser finito y distinto de 0")
+    try:
+        ranges = [tuple(float(v) for v in r.split(',')) for r in (args.kp, args.ki, args.kd)]
+        kp, ki, kd = gainGrid(*ranges)
+    except ValueError as e:
+        ap.error(str(e))
+
+    t0 = time.perf_counter()
+    model = identifyPath(args.session)
+    print(f"{model}  rmse={model.rmse:.3f}°  ({time.perf_counter() - t0:.2f} s)")
+
+    t0 = time.perf_counter()
+    res = sweep(model, kp, ki, kd, args.step, workers=args.workers)
+    print(f"{kp.shape[0]} combinaciones en {time.perf_counter() - t0:.2f} s")
+    for i in rank(res, args.by, top=10):
+        print(f"  kp={res['kp'][i]:.3f} ki={res['ki'][i]:.3f} kd={res['kd'][i]:.3f}  "
+              f"subida={res['rise'][i]:.3f}s sobrepaso={res['overshoot'][i]:.1f}% "
+              f"establec={res['settling'][i]:.3f}s IAE={res['iae'][i]:.2f}")
+
+
+if __name__ == "__main__":
+    main()